@@ -0,0 +1,193 @@
+# Anytime enumeration of p_ij with certified error bounds
+# Date: 18/10/2026
+# ======================
+#
+# In Tutzauer's formulation the walk from a source stops at a node with
+# probability sigma_t or moves to an unvisited downstream node with
+# probability T_tu, and these add up to 1 when the downstream strength
+# includes the self-loops (as in every Graph). Every path prefix therefore
+# carries a probability mass (the product of its transfer probabilities)
+# that is split between stopping at its last node and its one-node
+# extensions. Expanding prefixes one at a time, the mass of the prefixes
+# not expanded yet (the frontier) is the residual R = 1 - sum_j p_ij found
+# so far, known exactly at any time.
+#
+# Prefixes are expanded from the most probable one (a priority queue) or
+# by increasing depth, until R is below a tolerance, a time budget runs out
+# or the frontier is empty (exact result). Bounds are then rigorous:
+# - per entry, p_ij lies between the mass found for j and that plus the
+#   frontier mass of the prefixes whose last node can reach j,
+# - per node, the estimate q (the masses found, normalized) is within
+#   total variation distance R of the true row, so by the Fannes-Audenaert
+#   inequality its entropy is within R log2(d-1) + h2(R) of the true one,
+#   d being the number of nodes the source can reach (if R <= 1 - 1/d).
+# (Bounds hold up to floating point rounding of the products.) The frontier
+# is kept in memory, so a time budget or max_paths also bounds memory; the
+# time budget applies to the expansion, the bounds are calculated after.
+from collections import deque
+from heapq import heappush, heappop
+from math import log2
+import time
+from csrgraph import node_entropy
+
+
+def _binary_entropy(x):
+    '''Binary entropy h2(x) in bits.'''
+    if x <= 0 or x >= 1:
+        return 0.0
+    return -x * log2(x) - (1 - x) * log2(1 - x)
+
+
+
+def entropy_error_bound(residual, d):
+    '''Fannes-Audenaert bound on the difference between the entropy of two
+    distributions on d outcomes at total variation distance at most
+    residual. Returns None if residual > 1 - 1/d (no bound better than
+    log2(d)).'''
+    if d <= 1:
+        return 0.0
+    if residual > 1 - 1 / d:
+        return None
+    return residual * log2(d - 1) + _binary_entropy(residual)
+
+
+
+class AnytimeEnumerator:
+    def __init__(self, G, formulation_type="Tutzauer", order="probability"):
+        '''Initialize the enumerator for Graph G. Input variables:
+        - G: Graph,
+        - formulation_type: only "Tutzauer", whose probabilities out of a
+        source add up to 1 (a ValueError is raised otherwise),
+        - order: "probability" to expand the most probable prefix first or
+        "depth" to expand prefixes by increasing number of nodes.'''
+        if formulation_type != "Tutzauer":
+            raise ValueError("Anytime bounds need the Tutzauer formulation, "
+                             "whose p_ij out of a source add up to 1.")
+        if order not in ("probability", "depth"):
+            raise ValueError("order must be 'probability' or 'depth'.")
+        self.csr = G.csr
+        self.nodes = G.nodes
+        self.order = order
+        self.self_loops = G._self_loops()
+        self._reach = [None] * len(self.csr)
+
+
+    def reachable(self, u):
+        '''Set of node ids reachable from node id u (u included).'''
+        if self._reach[u] is None:
+            indptr, indices = self.csr.indptr, self.csr.indices
+            reach = {u}
+            stack = [u]
+            while stack:
+                t = stack.pop()
+                for k in range(indptr[t], indptr[t + 1]):
+                    if indices[k] not in reach:
+                        reach.add(indices[k])
+                        stack.append(indices[k])
+            self._reach[u] = reach
+        return self._reach[u]
+
+
+    def _expand(self, source, tolerance, time_budget, max_paths):
+        '''Expand the prefixes from node id source. Returns the masses found
+        (list by node id), the frontier (list of (mass, prefix)), the
+        residual mass and the number of prefixes expanded.'''
+        csr = self.csr
+        indptr, indices, weights = csr.indptr, csr.indices, csr.weights
+        out_strength, self_loops = csr.out_strength, self.self_loops
+        p_j = [0.0] * len(csr)
+        by_probability = self.order == "probability"
+        if by_probability:
+            frontier = [(-1.0, 0, (source,))]
+            push, pop = heappush, heappop
+        else:
+            frontier = deque([(-1.0, 0, (source,))])
+            push, pop = deque.append, deque.popleft
+        residual = 1.0
+        counter = 1
+        paths = 0
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        while frontier and residual > tolerance:
+            if max_paths is not None and paths >= max_paths:
+                break
+            if deadline is not None and paths % 1024 == 0 and time.perf_counter() > deadline:
+                break
+            mass, _, prefix = pop(frontier)
+            mass = -mass
+            residual -= mass
+            paths += 1
+            t = prefix[-1]
+            visited = prefix[:-1]
+            D_t = out_strength[t]
+            for k in range(indptr[t], indptr[t + 1]):
+                if indices[k] in visited:
+                    D_t = D_t - weights[k]
+            if D_t == 0:
+                p_j[t] += mass
+                continue
+            p_j[t] += mass * (self_loops[t] / D_t)
+            for k in range(indptr[t], indptr[t + 1]):
+                u = indices[k]
+                if u in prefix or weights[k] == 0:
+                    continue
+                child = mass * (weights[k] / D_t)
+                push(frontier, (-child, counter, prefix + (u,)))
+                counter += 1
+                residual += child
+        # The running sum may drift by rounding; the frontier is exact.
+        residual = sum(-mass for mass, _, _ in frontier)
+        return p_j, [(-mass, prefix) for mass, _, prefix in frontier], residual, paths
+
+
+    def estimate_from_i(self, i, tolerance=1e-6, time_budget=None, max_paths=None):
+        '''Calculate p_ij for all j in G and the entropy of node i, expanding
+        path prefixes until the residual probability mass is below
+        tolerance (or the time budget in seconds or max_paths prefixes run
+        out).
+        Output variables: dictionary with
+        - 'p_ij': dictionary with the probability mass found for every
+        (i,j), a lower bound of p_ij (keys of Graph._probability_paths_from_i),
+        - 'p_ij_bounds': dictionary of certified intervals (low, high),
+        - 'entropy': entropy of the masses found, normalized (as
+        Graph.calculate_node_entropy),
+        - 'entropy_bounds': certified interval (low, high) of the entropy,
+        - 'residual': probability mass not assigned yet,
+        - 'paths': number of prefixes expanded,
+        - 'exact': True if every path was enumerated.'''
+        csr = self.csr
+        N = len(csr)
+        p_j, frontier, residual, paths = self._expand(csr.index[i], tolerance,
+                                                      time_budget, max_paths)
+
+        # Frontier mass by last node, then by the nodes it can reach.
+        last = dict()
+        for mass, prefix in frontier:
+            last[prefix[-1]] = last.get(prefix[-1], 0) + mass
+        R_j = [0.0] * N
+        for t, mass in last.items():
+            for j in self.reachable(t):
+                R_j[j] += mass
+
+        d = len(self.reachable(csr.index[i]))
+        H = node_entropy(p_j)
+        bound = entropy_error_bound(residual, d)
+        if bound is None:
+            entropy_bounds = (0.0, log2(d))
+        else:
+            entropy_bounds = (max(H - bound, 0.0), min(H + bound, log2(d)))
+
+        labels = csr.labels
+        p_ij = {(i,j):0 for j in self.nodes}
+        p_ij_bounds = {(i,j):(0, 0) for j in self.nodes}
+        for j in range(N):
+            p_ij[(i,labels[j])] = p_j[j]
+            p_ij_bounds[(i,labels[j])] = (p_j[j], min(p_j[j] + min(R_j[j], residual), 1.0))
+        return {'p_ij': p_ij, 'p_ij_bounds': p_ij_bounds, 'entropy': H,
+                'entropy_bounds': entropy_bounds, 'residual': residual,
+                'paths': paths, 'exact': len(frontier) == 0}
+
+
+    def calculate_node_entropy(self, i, tolerance=1e-6, time_budget=None):
+        '''Calculate the entropy of node i within the tolerance. The function
+        returns a tuple (i, C_H) as Graph.calculate_node_entropy does.'''
+        return (i, self.estimate_from_i(i, tolerance, time_budget)['entropy'])
@@ -0,0 +1,358 @@
+# Benchmark suite
+# Date: 18/10/2026
+# ======================
+#
+# Times the p_ij engines and the GraphFile readers and writers on synthetic
+# manufacturing networks (synthetic_networks.py) and on the plant graph of
+# data/clean_manufacturing_edges.txt, records throughput and peak memory
+# and compares them with a stored baseline. Usage:
+#     python benchmark.py            run and compare with the baseline
+#     python benchmark.py --save     run and store the results as baseline
+#     python benchmark.py --quick    run the small cases only
+#     python benchmark.py --scaling  fit the runtime growth with the number
+#                                    of stations and extrapolate it
+# --tolerance=x sets the relative slowdown reported as a regression (1.0 by
+# default, i.e. twice as slow: timings on shared machines are noisy).
+# The program exits with status 1 if any benchmark regressed.
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from math import exp, log
+from graphfile import GraphFile
+from graph import Graph
+from condensation import CondensationEngine
+from scheduler import WorkStealingScheduler
+from synthetic_networks import manufacturing_network
+
+try:
+    from montecarlo import MonteCarloEstimator
+except ImportError:
+    MonteCarloEstimator = None
+
+
+BASELINE = "results/benchmark_baseline.json"
+
+# Synthetic cases (input variables of manufacturing_paths) and the plant
+# graph. Paths are only enumerated exhaustively in the synthetic cases;
+# in the plant graph every source scores max_paths paths.
+CASES = {
+    'line_16': {'network': dict(stations=16, lines=2, cell_size=2, density=0.1,
+                                weight_skew=1.0, routes=300, seed=1),
+                'quick': True},
+    'cells_32': {'network': dict(stations=32, lines=4, cell_size=3, density=0.1,
+                                 weight_skew=1.0, routes=1000, seed=1),
+                 'quick': True},
+    'skewed_40': {'network': dict(stations=40, lines=4, cell_size=4, density=0.05,
+                                  weight_skew=2.0, routes=2000, seed=1),
+                  'quick': False},
+    'plant': {'edges': "data/clean_manufacturing_edges.txt", 'max_paths': 10**4,
+              'quick': True},
+}
+
+
+
+# ===== Engines ============
+# Every engine takes (G, sources, case) and returns the amount of work done
+# in the unit given in ENGINES.
+
+def _enumeration(G, sources, case):
+    csr, loops = G.csr, G._self_loops()
+    paths = 0
+    for i in sources:
+        p_j = [0] * len(csr)
+        frontier, n = csr.probability_paths_from_prefix(
+            [csr.index[i]], "Tutzauer", p_j, loops, case.get('max_paths'))
+        paths += n
+    return paths
+
+
+def _graph_entropy(G, sources, case):
+    for i in sources:
+        G.calculate_node_entropy(i)
+    return len(sources)
+
+
+def _condensation(G, sources, case):
+    engine = CondensationEngine(G)
+    for i in sources:
+        engine.calculate_node_entropy(i)
+    return len(sources)
+
+
+def _visited_set(G, sources, case):
+    engine = CondensationEngine(G, memoize=True)
+    for i in sources:
+        engine.calculate_node_entropy(i)
+    return len(sources)
+
+
+def _monte_carlo(G, sources, case):
+    estimator = MonteCarloEstimator(G, seed=0)
+    walkers = 0
+    for i in sources:
+        walkers += estimator.estimate_from_i(i, tolerance=1e-2, max_walkers=10**5)['walkers']
+    return walkers
+
+
+def _scheduler(G, sources, case):
+    WorkStealingScheduler(G).probability_paths(sources)
+    return len(sources)
+
+
+# name: (function, unit, exhaustive enumeration only)
+ENGINES = {
+    'enumeration': (_enumeration, 'paths/s', False),
+    'graph_entropy': (_graph_entropy, 'sources/s', True),
+    'condensation': (_condensation, 'sources/s', False),
+    'visited_set': (_visited_set, 'sources/s', False),
+    'monte_carlo': (_monte_carlo, 'walkers/s', False),
+    'scheduler': (_scheduler, 'sources/s', True),
+}
+
+# ======= END Engines ===============
+
+
+
+def measure(function, repeat=3, min_time=0.2):
+    '''Time function() and measure its peak memory. The time is the best of
+    at least repeat runs, repeated until min_time seconds have been spent (a
+    single run if it takes more than a second); the peak memory allocated
+    by Python (kB) is measured in one more run with tracemalloc. Returns
+    (time, memory, value returned by function).'''
+    best, spent, runs = None, 0, 0
+    while runs < repeat or spent < min_time:
+        start = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        spent, runs = spent + elapsed, runs + 1
+        if elapsed > 1:
+            break
+    tracemalloc.start()
+    try:
+        function()
+        memory = tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+    return best, memory, value
+
+
+
+def _record(elapsed, memory, work, unit):
+    return {'time': elapsed, 'throughput': work / elapsed if elapsed > 0 else None,
+            'unit': unit, 'memory': memory}
+
+
+
+def benchmark_io(paths, edges, directory):
+    '''Benchmark the GraphFile writers and readers of paths with counts and
+    edges (paths may be None). Returns a dictionary of records.'''
+    records = dict()
+    files = [('edges', edges, GraphFile.write_graph_to_file, GraphFile.read_edges_from_file)]
+    if paths is not None:
+        files.append(('paths', paths, GraphFile.write_paths_with_count,
+                      GraphFile.read_paths_with_count))
+    for name, data, write, read in files:
+        f = GraphFile(os.path.join(directory, name + ".txt"))
+        elapsed, memory, value = measure(lambda: write(f, data))
+        records['write_' + name] = _record(elapsed, memory, len(data), 'lines/s')
+        elapsed, memory, value = measure(lambda: read(f))
+        records['read_' + name] = _record(elapsed, memory, len(value), 'lines/s')
+    return records
+
+
+
+def load_case(case):
+    '''Return (paths, edges) of a case. Synthetic paths get self-loops on
+    their end nodes (weighted_pij.py); the plant graph gets a self-loop of
+    weight 1 on every node (binary_pij.py, method 1).'''
+    if 'network' in case:
+        paths, edges = manufacturing_network(**case['network'])
+        edges = dict(edges)
+        for k,v in paths.items():
+            edges[(k[-1], k[-1])] = edges.get((k[-1], k[-1]), 0) + v
+        return paths, edges
+    edges = GraphFile(case['edges']).read_edges_from_file()
+    edges = {k:1 for k,v in edges.items()}
+    nodes = {n for e in edges for n in e}
+    for n in nodes:
+        edges[(n,n)] = 1
+    return None, edges
+
+
+
+def benchmark_case(case, engines=None):
+    '''Run all the benchmarks (or the engines listed) of a case. Returns a
+    dictionary with the size of the graph and the records.'''
+    paths, edges = load_case(case)
+    exhaustive = case.get('max_paths') is None
+    elapsed, memory, G = measure(lambda: Graph(dict(edges)))
+    records = {'build_graph': _record(elapsed, memory, len(edges), 'edges/s')}
+    sources = sorted(G.nodes, key=str)
+    for name, (function, unit, exhaustive_only) in ENGINES.items():
+        if engines is not None and name not in engines:
+            continue
+        if exhaustive_only and not exhaustive:
+            continue
+        if name == 'monte_carlo' and MonteCarloEstimator is None:
+            continue
+        elapsed, memory, work = measure(lambda: function(G, sources, case))
+        records[name] = _record(elapsed, memory, work, unit)
+    if engines is None:
+        with tempfile.TemporaryDirectory() as directory:
+            records.update(benchmark_io(paths, edges, directory))
+    return {'nodes': len(G.nodes), 'edges': len(edges), 'benchmarks': records}
+
+
+
+def run_suite(quick=False):
+    '''Run every case. Returns the results with a description of the
+    machine they were obtained on.'''
+    results = {'machine': {'python': platform.python_version(),
+                           'platform': platform.platform(),
+                           'processor': platform.processor(),
+                           'cpu_count': os.cpu_count()},
+               'cases': dict()}
+    for name, case in CASES.items():
+        if quick and not case['quick']:
+            continue
+        print("Running", name, "...", file=sys.stderr)
+        results['cases'][name] = benchmark_case(case)
+    return results
+
+
+
+def compare(results, baseline, tolerance=1.0, memory_floor=64):
+    '''Compare results with a baseline. A benchmark regressed if its time or
+    its memory grew by more than tolerance (relative); memory differences
+    below memory_floor kB are ignored. Returns a list of tuples (case,
+    benchmark, time ratio, memory ratio, status).'''
+    comparison = []
+    for case, result in results['cases'].items():
+        reference = baseline['cases'].get(case, {}).get('benchmarks', {})
+        for name, record in result['benchmarks'].items():
+            if name not in reference:
+                continue
+            time_ratio = record['time'] / reference[name]['time']
+            memory_ratio = record['memory'] / reference[name]['memory'] if reference[name]['memory'] else 1
+            memory_grew = (memory_ratio > 1 + tolerance and
+                           record['memory'] - reference[name]['memory'] > memory_floor)
+            if time_ratio > 1 + tolerance or memory_grew:
+                status = 'REGRESSION'
+            elif time_ratio < 1 / (1 + tolerance):
+                status = 'faster'
+            else:
+                status = 'ok'
+            comparison.append((case, name, time_ratio, memory_ratio, status))
+    return comparison
+
+
+
+def print_results(results, comparison=None):
+    '''Print the results (and their comparison with a baseline).'''
+    ratios = {(c, b):(t, m, s) for c, b, t, m, s in comparison or []}
+    for case, result in results['cases'].items():
+        print("\n{} ({} nodes, {} edges)".format(case, result['nodes'], result['edges']))
+        for name, record in result['benchmarks'].items():
+            line = "  {:<14} {:10.4f} s {:14.1f} {:<10} {:10.1f} kB".format(
+                name, record['time'], record['throughput'] or 0, record['unit'],
+                record['memory'])
+            if (case, name) in ratios:
+                t, m, s = ratios[(case, name)]
+                line = line + "  time x{:.2f} memory x{:.2f} {}".format(t, m, s)
+            print(line)
+
+
+
+# ===== Scaling ============
+
+def fit_growth(x, t):
+    '''Least squares fit of the runtimes t measured at sizes x to a power law
+    t = a x^b and to an exponential t = a exp(b x). Returns the better fit
+    as a dictionary with keys 'model' ('power' or 'exponential'), 'a' and
+    'b'.'''
+    def least_squares(X, Y):
+        n = len(X)
+        mean_x, mean_y = sum(X) / n, sum(Y) / n
+        sxx = sum((u - mean_x) ** 2 for u in X)
+        b = sum((u - mean_x) * (v - mean_y) for u, v in zip(X, Y)) / sxx
+        a = mean_y - b * mean_x
+        residual = sum((v - a - b * u) ** 2 for u, v in zip(X, Y))
+        return a, b, residual
+
+    Y = [log(v) for v in t]
+    a_p, b_p, r_p = least_squares([log(u) for u in x], Y)
+    a_e, b_e, r_e = least_squares(list(x), Y)
+    if r_p <= r_e:
+        return {'model': 'power', 'a': exp(a_p), 'b': b_p}
+    return {'model': 'exponential', 'a': exp(a_e), 'b': b_e}
+
+
+
+def predict(fit, x):
+    '''Runtime predicted by fit_growth at size x.'''
+    if fit['model'] == 'power':
+        return fit['a'] * x ** fit['b']
+    return fit['a'] * exp(fit['b'] * x)
+
+
+
+def scaling(stations=(12, 16, 20, 24, 28, 32), engines=('enumeration', 'condensation'),
+            predict_at=(52, 64, 104), **network):
+    '''Time engines on synthetic networks of growing size, fit the growth of
+    the runtime with the number of stations and extrapolate it. The other
+    input variables of manufacturing_paths can be given as keywords.
+    Returns a dictionary engine -> (times, fit).'''
+    parameters = dict(lines=4, cell_size=3, density=0.1, weight_skew=1.0, seed=1)
+    parameters.update(network)
+    times = {e:[] for e in engines}
+    for n in stations:
+        case = {'network': dict(parameters, stations=n, routes=30 * n)}
+        result = benchmark_case(case, engines)
+        for e in engines:
+            times[e].append(result['benchmarks'][e]['time'])
+    growth = dict()
+    for e in engines:
+        fit = fit_growth(stations, times[e])
+        growth[e] = (times[e], fit)
+        print("\n{}: {} fit, a = {:.3g}, b = {:.3g}".format(e, fit['model'], fit['a'], fit['b']))
+        for n, t in zip(stations, times[e]):
+            print("  {:4d} stations {:10.4f} s".format(n, t))
+        for n in predict_at:
+            print("  {:4d} stations {:10.4g} s (predicted)".format(n, predict(fit, n)))
+    return growth
+
+# ======= END Scaling ===============
+
+
+
+if __name__ == "__main__":
+    if "--scaling" in sys.argv[1:]:
+        scaling()
+        sys.exit(0)
+
+    results = run_suite(quick="--quick" in sys.argv[1:])
+    if "--save" in sys.argv[1:]:
+        with open(BASELINE, 'w') as f:
+            json.dump(results, f, indent=1)
+        print_results(results)
+        print("\nBaseline saved in", BASELINE)
+        sys.exit(0)
+
+    tolerance = 1.0
+    for argument in sys.argv[1:]:
+        if argument.startswith("--tolerance="):
+            tolerance = float(argument.split("=")[1])
+    comparison = None
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as f:
+            comparison = compare(results, json.load(f), tolerance)
+    else:
+        print("No baseline found in", BASELINE)
+    print_results(results, comparison)
+    if comparison and any(s == 'REGRESSION' for c, b, t, m, s in comparison):
+        sys.exit(1)
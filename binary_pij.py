@@ -3,7 +3,7 @@
 # Data used in this file: pre-processed ("data/clean_manufacturing_edges.txt")
 # Yamila Mariel Omar
 # Date of original code: 17th August 2020
-# Date of code last modification: 17th August 2020
+# Date of code last modification: 18th October 2026
 
 
 # ===== Function definitions ============
@@ -14,6 +14,25 @@ def add_self_loops(paths, edges):
         edges[self_loop] = edges.get(self_loop, 0) + v
     return edges
 
+
+def check_results(filename, reference):
+    '''Check that every line of the results file is byte-identical to a
+    line of a reference results file (e.g. a published one) and vice versa.
+    The order of the lines is not compared: the published files list the
+    nodes in the order of a set of strings, which changes between runs.
+    Returns True if the files have the same lines.'''
+    from collections import Counter
+    with open(filename, 'rb') as f:
+        lines = Counter(f)
+    with open(reference, 'rb') as f:
+        reference_lines = Counter(f)
+    different = sum((lines - reference_lines).values()) + sum((reference_lines - lines).values())
+    if different:
+        print("{} differs from {} in {} lines".format(filename, reference, different))
+    else:
+        print("{} has the same lines as {}".format(filename, reference))
+    return different == 0
+
 # ======= END Function Defs ===============
 
 
@@ -23,11 +42,23 @@ if __name__ == "__main__":
     # =====================
     from graphfile import GraphFile
     from graph import Graph
-    import multiprocessing
+    from scheduler import WorkStealingScheduler
+    from checkpoint import Checkpoint
+    from instrumentation import Instrumentation
+    from resultcache import ResultCache
+    from pijformat import create_dense, pij_to_text
     import datetime
     import sys
 
     method = int(sys.argv[1])
+    instrument = "--instrument" in sys.argv[2:]
+    # Rows of sources calculated in previous runs are read from the cache.
+    cache = None if "--no-cache" in sys.argv[2:] else ResultCache("results/cache")
+    # --check=<results file> compares the new results file with it.
+    check = None
+    for argument in sys.argv[2:]:
+        if argument.startswith("--check="):
+            check = argument[len("--check="):]
 
     # Read data: clean paths and clean edges
     # ======================================
@@ -49,33 +80,44 @@ if __name__ == "__main__":
         edges = {k:1 for k,v in edges.items()}
         G = Graph(edges)
 
-        nodes = G.nodes
-        for n in G.nodes:
-            G.addEdge(n, n, 1)
+        # Self-loops of weight 1 on all nodes. As in the published results,
+        # where they were added with addEdge after the Graph was initialized,
+        # they give the stopping probability but are not part of the
+        # downstream degree of the nodes.
+        self_loops = {n:1 for n in G.nodes}
 
         # Check that all edges have a value of 1
         assert len(set(G.edges.values())) == 1
 
         print("\nNumber of nodes: ", len(G.nodes))
-        print("Number of edges: ", len(G.edges.keys()))
+        print("Number of edges: ", len(G.edges.keys()) + len(self_loops))
 
         print("Binary, directed graph with self-loops on all nodes\n")
-        pool = multiprocessing.Pool()
+        instrumentation = None
+        if instrument:
+            instrumentation = Instrumentation("results/binary_pij_directed_selfloopsonallnodes.log.jsonl",
+                                              total_sources=len(G.nodes))
+        scheduler = WorkStealingScheduler(G, "Tutzauer", instrumentation=instrumentation,
+                                          self_loops=self_loops, cache=cache)
+        checkpoint = Checkpoint("results/binary_pij_directed_selfloopsonallnodes.checkpoint")
+        # Finished rows are written into a dense p_ij store as they come.
+        store_filename = "results/binary_pij_directed_selfloopsonallnodes.pij"
+        store = create_dense(store_filename, G.nodes, G.nodes, G.nodes,
+                             {'formulation_type': "Tutzauer"})
         start = datetime.datetime.now()
-        input_variables = zip(G.nodes, ["Tutzauer"]*len(G.nodes))
         print("Start time: ", start)
-        r = pool.starmap(G._probability_paths_from_i, input_variables)
+        scheduler.probability_paths(checkpoint=checkpoint, output=store)
         end = datetime.datetime.now()
         print("End time: ", end)
         print("Run time: ", end - start)
-        pool.close()
-        pool.join()
-
-        p_ij = {k:v for d in r for k,v in d.items()}
+        if instrumentation is not None:
+            instrumentation.close()
 
         end_date = end.strftime("%Y_%m_%d_")
         filename = "results/" + end_date + "binary_pij_directed_selfloopsonallnodes.txt"
-        GraphFile(full_path + filename).write_graph_to_file(p_ij)
+        store.close()
+        pij_to_text(store_filename, filename)
+        checkpoint.remove()
 
 
 
@@ -94,22 +136,34 @@ if __name__ == "__main__":
         print("Number of edges: ", len(G.edges.keys()))
 
         print("Binary, directed graph with self-loops on end nodes only\n")
-        pool = multiprocessing.Pool()
+        instrumentation = None
+        if instrument:
+            instrumentation = Instrumentation("results/binary_pij_directed_selfloopsonendnodesonly.log.jsonl",
+                                              total_sources=len(G.nodes))
+        scheduler = WorkStealingScheduler(G, "Tutzauer", instrumentation=instrumentation,
+                                          cache=cache)
+        checkpoint = Checkpoint("results/binary_pij_directed_selfloopsonendnodesonly.checkpoint")
+        # Finished rows are written into a dense p_ij store as they come.
+        store_filename = "results/binary_pij_directed_selfloopsonendnodesonly.pij"
+        store = create_dense(store_filename, G.nodes, G.nodes, G.nodes,
+                             {'formulation_type': "Tutzauer"})
         start = datetime.datetime.now()
-        input_variables = zip(G.nodes, ["Tutzauer"]*len(G.nodes))
         print("Start time: ", start)
-        r = pool.starmap(G._probability_paths_from_i, input_variables)
+        scheduler.probability_paths(checkpoint=checkpoint, output=store)
         end = datetime.datetime.now()
         print("End time: ", end)
         print("Run time: ", end - start)
-        pool.close()
-        pool.join()
-
-        p_ij = {k:v for d in r for k,v in d.items()}
+        if instrumentation is not None:
+            instrumentation.close()
 
         end_date = end.strftime("%Y_%m_%d_")
         filename = "results/" + end_date + "binary_pij_directed_selfloopsonendnodesonly.txt"
-        GraphFile(full_path + filename).write_graph_to_file(p_ij)
+        store.close()
+        pij_to_text(store_filename, filename)
+        checkpoint.remove()
 
     else:
         print("Method {} does not exist!".format(method))
+
+    if check is not None and method in (1, 2) and not check_results(filename, check):
+        sys.exit(1)
@@ -0,0 +1,139 @@
+# Checkpoint and resume for long p_ij runs
+# Date: 18/10/2026
+# ======================
+#
+# The checkpoint is an append-only file with one JSON record per line:
+# - {"run": ...}: parameters of the run, written once at the top,
+# - {"task": ...}: a finished path-prefix task of WorkStealingScheduler,
+# with its partial p_ij row and the prefixes it split into,
+# - {"source": ...}: the final p_ij row of a finished source node.
+# Floats are written with repr, so they are read back exactly and the
+# resumed run gives the same p_ij (and results file) as an uninterrupted
+# one. A line cut short by a crash is ignored.
+import json
+import os
+import time
+from resultcache import graph_hash
+from scheduler import sum_partials
+
+
+class Checkpoint:
+    def __init__(self, filename, record_tasks=True, sync_interval=60):
+        '''Initialize the checkpoint. Input variables:
+        - filename: checkpoint file. If it exists, the run is resumed,
+        - record_tasks: whether finished tasks of sources that are still in
+        progress are recorded too (otherwise only finished sources are),
+        - sync_interval: seconds between forced writes (os.fsync) to disk.'''
+        self.filename = filename
+        self.record_tasks = record_tasks
+        self.sync_interval = sync_interval
+        self._file = None
+        self._last_sync = time.monotonic()
+
+
+    def _run_parameters(self, scheduler):
+        '''Parameters that must be the same to resume a run.'''
+        return {'graph': graph_hash(scheduler.csr, scheduler.self_loops),
+                'formulation_type': scheduler.formulation_type,
+                'max_paths': scheduler.max_paths}
+
+
+    def _read_records(self):
+        '''Read the records of an existing checkpoint file.'''
+        records = []
+        with open(self.filename) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+        return records
+
+
+    def resume(self, scheduler, sources, partials):
+        '''Load the work already done into partials (dictionary source ->
+        {j: [partial values]}) and return the tasks that are left to run.
+        A new checkpoint is started if the file does not exist. Sources whose
+        tasks were all done, but whose row was not recorded (the run stopped
+        in between), are recorded as finished.'''
+        parameters = self._run_parameters(scheduler)
+        records = self._read_records() if os.path.exists(self.filename) else []
+        if records and records[0].get('run') != parameters:
+            raise ValueError("{} belongs to a different run.".format(self.filename))
+
+        finished, done_tasks = dict(), dict()
+        for record in records[1:]:
+            if 'source' in record:
+                finished[record['source']] = record['row']
+            elif 'task' in record:
+                source, prefix, partial, frontier = record['task']
+                done_tasks[(source, tuple(prefix))] = (partial, frontier)
+
+        index = scheduler.csr.index
+        tasks = []
+        completed = []
+        for i in sources:
+            if i in finished:
+                partials[i] = {j:[p] for j,p in finished[i]}
+                continue
+            pending = len(tasks)
+            # Walk the task tree of source i down to the tasks not yet done.
+            stack = [[index[i]]]
+            while stack:
+                prefix = stack.pop()
+                if (i, tuple(prefix)) in done_tasks:
+                    partial, frontier = done_tasks[(i, tuple(prefix))]
+                    for j, p in partial:
+                        partials[i].setdefault(j, []).append(p)
+                    stack.extend(reversed(frontier))
+                else:
+                    tasks.append((i, prefix))
+            if len(tasks) == pending:
+                completed.append(i)
+
+        # Rewrite the file without a possibly truncated last line.
+        with open(self.filename + ".tmp", 'w') as f:
+            for record in [{'run': parameters}] + records[1:]:
+                f.write(json.dumps(record) + '\n')
+        os.replace(self.filename + ".tmp", self.filename)
+        self._file = open(self.filename, 'a')
+        for i in completed:
+            self.source_finished(i, partials[i])
+        return tasks
+
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+
+
+    def task_finished(self, source, prefix, partial, frontier):
+        '''Record a finished task (partial is a dictionary {j: p}).'''
+        if self.record_tasks:
+            self._write({'task': [source, prefix, list(partial.items()), frontier]})
+
+
+    def source_finished(self, source, row):
+        '''Record the final row of a source (row is {j: [partial values]}).'''
+        self._write({'source': source,
+                     'row': [[j, sum_partials(parts)] for j, parts in row.items()]})
+
+
+    def close(self):
+        '''Flush and close the checkpoint file.'''
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+
+    def remove(self):
+        '''Close and delete the checkpoint file (e.g. once the results file
+        has been written).'''
+        self.close()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
@@ -0,0 +1,348 @@
+# Compressed sparse row (CSR) graph core
+# Date: 18/10/2026
+# ======================
+from array import array
+from math import log
+
+
+def node_sort_key(n):
+    '''Sort key for node labels. Workstations (integers) come first and
+    dummy nodes such as 'i', 'f', 'source' or 'sink' (strings) last.'''
+    return (isinstance(n, str), n)
+
+
+
+def node_entropy(p_j):
+    '''Calculate the entropy of a row of path probabilities p_j following
+    Graph.calculate_node_entropy: the row is normalized so that it sums
+    to 1 and Shannon's entropy (base 2) is returned.'''
+    p_i = sum(p_j)
+    C_H = 0
+    for p in p_j:
+        if p != 0:
+            if p_i != 0:
+                p = p / p_i
+            C_H = C_H + p * log(p, 2)
+    return - C_H
+
+
+
+class CSRGraph:
+    '''Immutable, integer indexed representation of a weighted directed
+    graph. Node labels are remapped to dense ids 0..N-1 (sorted with
+    node_sort_key) and the downstream neighbours of node u are stored in
+    indices[indptr[u]:indptr[u+1]] with their weights in the same slice of
+    weights. Attributes:
+        - labels: tuple of node labels, labels[u] is the label of id u,
+        - index: dictionary from node label to id,
+        - indptr: array of N+1 row offsets,
+        - indices: array of E downstream node ids,
+        - weights: array of E edge weights,
+        - out_strength: array of N downstream strengths (self-loops included),
+        - self_loops: array of N self-loop weights (0 if there is none).'''
+    __slots__ = ('labels', 'index', 'indptr', 'indices', 'weights',
+                 'out_strength', 'self_loops')
+
+    def __init__(self, edges):
+        '''Build the CSR graph in O(N + E) from a dictionary with edge tuples
+        as keys (i,j) and weight w_ij as values, as returned by
+        GraphFile.read_edges_from_file.'''
+        labels = set()
+        for (u, v) in edges.keys():
+            labels.add(u)
+            labels.add(v)
+        labels = tuple(sorted(labels, key=node_sort_key))
+        index = {n:k for k,n in enumerate(labels)}
+        N = len(labels)
+
+        # Integer weights are kept as integers so that the arithmetic is
+        # the same as with the edges dictionary.
+        if all(isinstance(w, int) for w in edges.values()):
+            typecode = 'q'
+        else:
+            typecode = 'd'
+
+        # Bucket the edges by target first, so that each row ends up sorted
+        # by target id without a comparison sort.
+        by_target = [[] for _ in range(N)]
+        out_degree = [0] * N
+        for (u, v), w in edges.items():
+            u, v = index[u], index[v]
+            by_target[v].append((u, w))
+            out_degree[u] += 1
+
+        indptr = array('q', [0] * (N + 1))
+        for u in range(N):
+            indptr[u + 1] = indptr[u] + out_degree[u]
+        position = list(indptr[:-1])
+        indices = array('q', [0] * len(edges))
+        weights = array(typecode, [0] * len(edges))
+        out_strength = array(typecode, [0] * N)
+        self_loops = array(typecode, [0] * N)
+        for v in range(N):
+            for u, w in by_target[v]:
+                k = position[u]
+                indices[k], weights[k] = v, w
+                position[u] = k + 1
+                out_strength[u] += w
+                if u == v:
+                    self_loops[u] = w
+
+        self._set_attributes(labels, index, indptr, indices, weights,
+                             out_strength, self_loops)
+
+
+    @classmethod
+    def _from_arrays(cls, labels, indptr, indices, weights, out_strength,
+                     self_loops):
+        '''Build a CSRGraph from its arrays (used to unpickle it).'''
+        csr = object.__new__(cls)
+        index = {n:k for k,n in enumerate(labels)}
+        csr._set_attributes(tuple(labels), index, indptr, indices, weights,
+                            out_strength, self_loops)
+        return csr
+
+
+    def __reduce__(self):
+        return (CSRGraph._from_arrays,
+                (self.labels, self.indptr, self.indices, self.weights,
+                 self.out_strength, self.self_loops))
+
+
+    def _set_attributes(self, labels, index, indptr, indices, weights,
+                        out_strength, self_loops):
+        '''Assign the slots once. CSRGraph does not allow any further
+        assignment.'''
+        set_attribute = object.__setattr__
+        set_attribute(self, 'labels', labels)
+        set_attribute(self, 'index', index)
+        set_attribute(self, 'indptr', indptr)
+        set_attribute(self, 'indices', indices)
+        set_attribute(self, 'weights', weights)
+        set_attribute(self, 'out_strength', out_strength)
+        set_attribute(self, 'self_loops', self_loops)
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CSRGraph is immutable.")
+
+
+    def __len__(self):
+        '''Number of nodes.'''
+        return len(self.labels)
+
+
+    @property
+    def number_of_edges(self):
+        '''Number of edges (self-loops included).'''
+        return len(self.indices)
+
+
+    def downstream(self, u):
+        '''Return the ids of the downstream neighbours of node id u.'''
+        return self.indices[self.indptr[u]:self.indptr[u + 1]]
+
+
+    def downstream_nodes(self):
+        '''Dictionary view: node label -> list of downstream node labels.'''
+        labels, indptr, indices = self.labels, self.indptr, self.indices
+        return {labels[u]:[labels[v] for v in indices[indptr[u]:indptr[u + 1]]]
+                for u in range(len(labels))}
+
+
+    def downstream_strength(self):
+        '''Dictionary view: node label -> downstream strength.'''
+        return dict(zip(self.labels, self.out_strength))
+
+
+    def degree(self):
+        '''Return two lists (in-degree, out-degree) indexed by node id.'''
+        N, indptr = len(self.labels), self.indptr
+        in_degree = [0] * N
+        for v in self.indices:
+            in_degree[v] += 1
+        out_degree = [indptr[u + 1] - indptr[u] for u in range(N)]
+        return in_degree, out_degree
+
+
+    def strength(self):
+        '''Return two lists (in-strength, out-strength) indexed by node id.'''
+        in_strength = [0] * len(self.labels)
+        for v, w in zip(self.indices, self.weights):
+            in_strength[v] += w
+        return in_strength, list(self.out_strength)
+
+
+    def yield_paths_from(self, i):
+        '''Find all paths from node id i in depth-first order. Each path is
+        yielded as a new list of node ids.'''
+        indptr, indices = self.indptr, self.indices
+        seen = bytearray(len(self.labels))
+        seen[i] = 1
+        path = [i]
+        yield list(path)
+        stack = [indptr[i]]
+        while stack:
+            t, k = path[-1], stack[-1]
+            end = indptr[t + 1]
+            while k < end and seen[indices[k]]:
+                k += 1
+            if k < end:
+                stack[-1] = k + 1
+                u = indices[k]
+                seen[u] = 1
+                path.append(u)
+                yield list(path)
+                stack.append(indptr[u])
+            else:
+                stack.pop()
+                seen[path.pop()] = 0
+
+
+    def yield_path_probabilities_from(self, i, formulation_type, self_loops=None):
+        '''Find all paths from node id i and yield a tuple (j, product) with
+        the end node id j and the probability of each path, as defined by
+        Tutzauer (2007) and generalized to weighted graphs. Any other value
+        of formulation_type follows the arrival formulation proposed in the
+        article. The running product of transfer probabilities and the
+        downstream degree of every node in the path are carried on the DFS
+        stack so that each path is scored from its prefix.
+        Input variables:
+        - i: id of the source node,
+        - formulation_type: "Tutzauer" or any other value,
+        - self_loops: optional sequence of self-loop weights by node id used
+        for the stopping probability (defaults to self.self_loops).'''
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        out_strength = self.out_strength
+        if self_loops is None:
+            self_loops = self.self_loops
+        tutzauer = formulation_type == "Tutzauer"
+        seen = bytearray(len(self.labels))
+        stack = []
+        t, product = i, 1
+        while True:
+            # Visit t: downstream degree without the already visited nodes.
+            start, end = indptr[t], indptr[t + 1]
+            D_t = out_strength[t]
+            for k in range(start, end):
+                if seen[indices[k]]:
+                    D_t = D_t - weights[k]
+            seen[t] = 1
+            if tutzauer and D_t != 0:
+                yield t, product * (self_loops[t] / D_t)
+            else:
+                yield t, product
+            stack.append([t, D_t, product, start, end])
+
+            # Move on to the next unvisited downstream node.
+            while stack:
+                frame = stack[-1]
+                u, D_u, P_u, k, end = frame
+                while k < end and seen[indices[k]]:
+                    k += 1
+                if k < end:
+                    frame[3] = k + 1
+                    t = indices[k]
+                    T_k = weights[k] / D_u if D_u != 0 else 0
+                    product = P_u * T_k
+                    break
+                stack.pop()
+                seen[u] = 0
+            else:
+                return
+
+
+    def probability_paths_from(self, i, formulation_type, self_loops=None):
+        '''Calculate all the probabilities i -> j for all j in G. Returns a
+        list p_j indexed by node id. Input variables are the same as for
+        yield_path_probabilities_from.'''
+        p_j = [0] * len(self.labels)
+        for j, product in self.yield_path_probabilities_from(i, formulation_type, self_loops):
+            p_j[j] += product
+        return p_j
+
+
+    def probability_paths_from_prefix(self, prefix, formulation_type, p_j,
+                                      self_loops=None, max_paths=None,
+                                      depth_counts=None):
+        '''Add to p_j (list indexed by node id) the probability of every path
+        that starts with prefix (a list of node ids forming a path), prefix
+        included. If max_paths is given, the enumeration stops after
+        max_paths paths and the unexplored part is returned as a list of
+        new prefixes; together they cover exactly the remaining paths. If
+        depth_counts (a list of N zeros) is given, depth_counts[d] counts the
+        paths with d edges.
+        Output variables:
+        - list of unexplored prefixes (empty if the enumeration finished),
+        - number of paths scored.'''
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        out_strength = self.out_strength
+        if self_loops is None:
+            self_loops = self.self_loops
+        tutzauer = formulation_type == "Tutzauer"
+        seen = bytearray(len(self.labels))
+
+        def downstream_degree(t):
+            D_t = out_strength[t]
+            for k in range(indptr[t], indptr[t + 1]):
+                if seen[indices[k]]:
+                    D_t = D_t - weights[k]
+            return D_t
+
+        # Transfer probability product along the prefix.
+        product = 1
+        for t, u in zip(prefix, prefix[1:]):
+            D_t = downstream_degree(t)
+            seen[t] = 1
+            for k in range(indptr[t], indptr[t + 1]):
+                if indices[k] == u:
+                    product = product * (weights[k] / D_t if D_t != 0 else 0)
+                    break
+
+        paths = 0
+        base = len(prefix) - 1
+        stack = []
+        t = prefix[-1]
+        while True:
+            start, end = indptr[t], indptr[t + 1]
+            D_t = downstream_degree(t)
+            seen[t] = 1
+            if tutzauer and D_t != 0:
+                p_j[t] += product * (self_loops[t] / D_t)
+            else:
+                p_j[t] += product
+            paths += 1
+            if depth_counts is not None:
+                depth_counts[base + len(stack)] += 1
+            stack.append([t, D_t, product, start, end])
+            if max_paths is not None and paths >= max_paths:
+                break
+
+            while stack:
+                frame = stack[-1]
+                u, D_u, P_u, k, end = frame
+                while k < end and seen[indices[k]]:
+                    k += 1
+                if k < end:
+                    frame[3] = k + 1
+                    t = indices[k]
+                    T_k = weights[k] / D_u if D_u != 0 else 0
+                    product = P_u * T_k
+                    break
+                stack.pop()
+                seen[u] = 0
+            else:
+                return [], paths
+
+        # Budget exhausted: the unexplored children of every frame on the
+        # stack become new prefixes.
+        frontier = []
+        path = list(prefix[:-1])
+        for t, D_t, P_t, k, end in stack:
+            path.append(t)
+            on_path = set(path)
+            for k in range(k, end):
+                u = indices[k]
+                if u not in on_path:
+                    frontier.append(path + [u])
+        return frontier, paths
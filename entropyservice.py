@@ -0,0 +1,390 @@
+# Local entropy query service
+# Date: 18/10/2026
+# ======================
+#
+# Loads a Graph once and answers entropy, p_ij row, degree and strength
+# queries over HTTP, on a TCP port or a Unix socket (asyncio). The rows and
+# entropy of the sources already calculated are kept in an in-memory LRU
+# cache (an OrderedDict, as the open items of eventstream.PathAssembler),
+# so a dashboard asking again for a node gets its answer without any path
+# enumeration. Missing rows are calculated in a process pool whose workers
+# attach to a SharedGraph; the event loop keeps answering the other
+# requests meanwhile, and concurrent requests for the same node wait for
+# the same calculation.
+#
+# Edge updates go through Graph.addEdge and Graph.deleteEdge, which mark the
+# sources that can reach the edited edge as invalidated: only their entries
+# are removed from the cache (and recalculated in the background if they
+# were cached), every other row stays valid. A calculation that was running
+# while its source was invalidated is started again on the new graph.
+#
+# Requests (JSON answers; nodes are integers or the labels of the graph):
+#     GET  /entropy/<node>    {"node": n, "entropy": C_H}
+#     GET  /entropy           {"entropy": {node: C_H}} for all the nodes
+#     GET  /row/<node>        {"node": n, "p_ij": {j: p_ij}}
+#     GET  /degree/<node>     {"node": n, "in": k_in, "out": k_out}
+#     GET  /strength/<node>   {"node": n, "in": s_in, "out": s_out}
+#     GET  /stats             cache and graph counters
+#     POST /edges             body [[i, j, w_ij], ...]; w_ij null deletes
+#                             the edge. Answers {"invalidated": [...]}
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote
+import asyncio
+import json
+import os
+import sys
+from csrgraph import node_entropy, node_sort_key
+from sharedgraph import SharedGraph
+from resultcache import cache_key
+
+
+# Shared graph the worker process is attached to: (name, shm, csr).
+_worker_graph = None
+
+
+def _row_from_i(spec, i, formulation_type):
+    '''Calculate the row of node id i of the shared graph described by spec
+    in a worker process. The worker attaches to a new graph when the spec
+    changes (after edge updates) and releases the previous one.'''
+    global _worker_graph
+    if _worker_graph is None or _worker_graph[0] != spec[0]:
+        if _worker_graph is not None:
+            shm = _worker_graph[1]
+            _worker_graph = None
+            shm.close()
+        shm, csr = SharedGraph.attach(spec)
+        _worker_graph = (spec[0], shm, csr)
+    return _worker_graph[2].probability_paths_from(i, formulation_type)
+
+
+
+def _node(token):
+    '''Node of a request token: an integer, or the token itself.'''
+    try:
+        return int(token)
+    except ValueError:
+        return token
+
+
+
+class EntropyService:
+    def __init__(self, G, formulation_type="Tutzauer", max_entries=4096,
+                 processes=None, self_loops=None, cache=None, recalculate=True):
+        '''Initialize the service. Input variables:
+        - G: Graph (edited in place by update_edges),
+        - formulation_type: "Tutzauer" by default,
+        - max_entries: number of rows kept in the LRU cache,
+        - processes: number of worker processes (default: all cores),
+        - self_loops: optional dictionary node -> self-loop weight used for
+        the stopping probability instead of the self-loops of G (as in
+        WorkStealingScheduler),
+        - cache: optional ResultCache, read before a row is calculated and
+        filled after,
+        - recalculate: whether cached rows invalidated by an edge update are
+        calculated again in the background.'''
+        self.G = G
+        self.formulation_type = formulation_type
+        self.max_entries = max_entries
+        self.processes = processes or os.cpu_count()
+        self.self_loops_override = self_loops
+        self.cache = cache
+        self.recalculate = recalculate
+        self.entries = OrderedDict()
+        self.pending = dict()
+        self.version = 0
+        self.invalidated_at = dict()
+        self.hits = 0
+        self.misses = 0
+        self.calculated = 0
+        self._executor = None
+        self._graphs = dict()
+        self._background = set()
+        G.pop_invalidated_sources()
+        self._new_graph()
+
+
+    def _new_graph(self):
+        '''Share the current graph with the workers. Shared graphs of
+        previous versions are released once no calculation uses them.'''
+        csr = self.G.csr
+        if self.self_loops_override is None:
+            self.self_loops = self.G._self_loops()
+        else:
+            self.self_loops = [self.self_loops_override.get(n, 0) for n in csr.labels]
+        self.csr = csr
+        self.graph = SharedGraph(csr, self.self_loops)
+        self._graphs[self.graph.spec[0]] = [self.graph, 0]
+        self.key = None
+        if self.cache is not None:
+            self.key = cache_key(csr, self.self_loops, self.formulation_type)
+        self._degree = None
+        self._strength = None
+        self._release_graphs()
+
+
+    def _release_graphs(self):
+        '''Close the shared graphs of previous versions that are not used.'''
+        for name, (graph, users) in list(self._graphs.items()):
+            if graph is not self.graph and users == 0:
+                graph.close()
+                del self._graphs[name]
+
+
+    def _store(self, i, entry):
+        '''Put the entry of source i in the LRU cache.'''
+        self.entries[i] = entry
+        self.entries.move_to_end(i)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+    async def _calculate(self, i):
+        '''Calculate the entry (p_ij as {j: p}, entropy) of source i, again
+        if i is invalidated while it is being calculated.'''
+        loop = asyncio.get_running_loop()
+        while True:
+            if i not in self.G.nodes:
+                raise KeyError(i)
+            version, csr, key = self.version, self.csr, self.key
+            row = None
+            if self.cache is not None:
+                row = self.cache.get_row(key, i)
+            if row is None:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(self.processes)
+                record = self._graphs[self.graph.spec[0]]
+                record[1] += 1
+                try:
+                    row = await loop.run_in_executor(
+                        self._executor, _row_from_i, record[0].spec, csr.index[i],
+                        self.formulation_type)
+                finally:
+                    record[1] -= 1
+                    self._release_graphs()
+                self.calculated += 1
+                if self.cache is not None:
+                    self.cache.put_row(key, i, row)
+            if self.invalidated_at.get(i, -1) <= version:
+                break
+        labels = csr.labels
+        entry = ({labels[j]:p for j, p in enumerate(row) if p != 0}, node_entropy(row))
+        self._store(i, entry)
+        return entry
+
+
+    async def entry(self, i):
+        '''Return the entry (p_ij as {j: p}, entropy) of source i from the
+        LRU cache, or calculate it. Raises KeyError if i is not a node.'''
+        entry = self.entries.get(i)
+        if entry is not None:
+            self.entries.move_to_end(i)
+            self.hits += 1
+            return entry
+        if i not in self.G.nodes:
+            raise KeyError(i)
+        self.misses += 1
+        future = self.pending.get(i)
+        if future is None:
+            future = self.pending[i] = asyncio.ensure_future(self._calculate(i))
+            future.add_done_callback(lambda f: self.pending.pop(i, None))
+        return await asyncio.shield(future)
+
+
+    async def entropy(self, i):
+        '''Entropy of node i, as Graph.calculate_node_entropy.'''
+        return (await self.entry(i))[1]
+
+
+    async def row(self, i):
+        '''p_ij of source i as a dictionary j -> p_ij over all the nodes.'''
+        p_j = (await self.entry(i))[0]
+        return {j:p_j.get(j, 0) for j in sorted(self.G.nodes, key=node_sort_key)}
+
+
+    async def all_entropy(self):
+        '''Entropy of every node, calculating the missing ones in parallel.'''
+        nodes = sorted(self.G.nodes, key=node_sort_key)
+        values = await asyncio.gather(*(self.entropy(i) for i in nodes))
+        return dict(zip(nodes, values))
+
+
+    def degree(self, i):
+        '''Tuple (in-degree, out-degree) of node i.'''
+        if self._degree is None:
+            self._degree = self.G.degree
+        return self._degree[0][i], self._degree[1][i]
+
+
+    def strength(self, i):
+        '''Tuple (in-strength, out-strength) of node i.'''
+        if self._strength is None:
+            self._strength = self.G.strength
+        return self._strength[0][i], self._strength[1][i]
+
+
+    def update_edges(self, updates):
+        '''Apply edge updates, a list of (i, j, w_ij) with w_ij None to
+        delete the edge. Only the cached entries of the sources that can
+        reach an edited edge are removed; they are calculated again in the
+        background if self.recalculate is True. Returns the set of
+        invalidated sources.'''
+        for i, j, w_ij in updates:
+            if w_ij is None:
+                self.G.deleteEdge(i, j)
+            else:
+                self.G.addEdge(i, j, w_ij)
+        invalidated = self.G.pop_invalidated_sources()
+        if not updates:
+            return invalidated
+        self.version += 1
+        for i in invalidated:
+            self.invalidated_at[i] = self.version
+        removed = [i for i in invalidated if self.entries.pop(i, None) is not None]
+        for i in [i for i in self.entries if i not in self.G.nodes]:
+            del self.entries[i]
+        self._new_graph()
+        if self.recalculate:
+            for i in removed:
+                if i in self.G.nodes:
+                    task = asyncio.ensure_future(self.entry(i))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+        return invalidated
+
+
+    def stats(self):
+        '''Dictionary with the counters of the service.'''
+        return {'nodes': len(self.G.nodes), 'edges': len(self.G.edges),
+                'entries': len(self.entries), 'pending': len(self.pending),
+                'hits': self.hits, 'misses': self.misses,
+                'calculated': self.calculated, 'version': self.version}
+
+
+    async def answer(self, method, target, body):
+        '''Answer a request. Returns a tuple (HTTP status, JSON object).'''
+        parts = [unquote(p) for p in target.split('?')[0].split('/') if p]
+        try:
+            if method == 'POST' and parts == ['edges']:
+                updates = [(_node(str(i)), _node(str(j)), w) for i, j, w in json.loads(body)]
+                invalidated = self.update_edges(updates)
+                return 200, {'invalidated': sorted(invalidated, key=node_sort_key)}
+            if method != 'GET':
+                return 405, {'error': 'method not allowed'}
+            if parts == ['stats']:
+                return 200, self.stats()
+            if parts == ['entropy']:
+                return 200, {'entropy': await self.all_entropy()}
+            if len(parts) != 2:
+                return 404, {'error': 'not found'}
+            query, i = parts[0], _node(parts[1])
+            if query == 'entropy':
+                return 200, {'node': i, 'entropy': await self.entropy(i)}
+            if query == 'row':
+                return 200, {'node': i, 'p_ij': await self.row(i)}
+            if query == 'degree':
+                k_in, k_out = self.degree(i)
+                return 200, {'node': i, 'in': k_in, 'out': k_out}
+            if query == 'strength':
+                s_in, s_out = self.strength(i)
+                return 200, {'node': i, 'in': s_in, 'out': s_out}
+            return 404, {'error': 'not found'}
+        except KeyError as e:
+            return 404, {'error': 'node {} not in graph'.format(e.args[0])}
+        except (ValueError, TypeError):
+            return 400, {'error': 'bad request'}
+
+
+    async def handle(self, reader, writer):
+        '''Answer the HTTP/1.1 requests of a connection (kept alive until
+        the client closes it or asks to).'''
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                try:
+                    method, target, version = request.decode('latin-1').split()
+                except ValueError:
+                    status, payload, close = 400, {'error': 'bad request'}, True
+                else:
+                    headers = dict()
+                    while True:
+                        line = await reader.readline()
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        name, _, value = line.decode('latin-1').partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                    body = await reader.readexactly(int(headers.get('content-length', 0)))
+                    status, payload = await self.answer(method, target, body)
+                    close = (headers.get('connection', '').lower() == 'close'
+                             or version == 'HTTP/1.0')
+                data = json.dumps(payload).encode()
+                writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\n"
+                             "Content-Length: {}\r\n{}\r\n".format(
+                                 status, 'OK' if status == 200 else 'Error', len(data),
+                                 'Connection: close\r\n' if close else '').encode() + data)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+    async def serve(self, address):
+        '''Start the HTTP server on address: 'unix:<path>' for a Unix socket
+        or 'host:port'. Returns the asyncio server (close it to stop).'''
+        if address.startswith('unix:'):
+            path = address[len('unix:'):]
+            if os.path.exists(path):
+                os.remove(path)
+            return await asyncio.start_unix_server(self.handle, path)
+        host, _, port = address.rpartition(':')
+        return await asyncio.start_server(self.handle, host or None, int(port))
+
+
+    def close(self):
+        '''Stop the worker processes and release the shared graphs.'''
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        for graph, users in self._graphs.values():
+            graph.close()
+        self._graphs.clear()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+async def _main(filename, address):
+    '''Serve the entropy of the graph in filename until interrupted.'''
+    from graphfile import GraphFile
+    from graph import Graph
+    with EntropyService(Graph(GraphFile(filename).read_edges_from_file())) as service:
+        server = await service.serve(address)
+        print("Serving {} on {}".format(filename, address))
+        async with server:
+            await server.serve_forever()
+
+
+
+if __name__ == "__main__":
+    # Serve the entropy of a graph until interrupted (Ctrl+C), e.g.
+    #     python entropyservice.py data/clean_manufacturing_edges.txt 127.0.0.1:8000
+    #     curl 127.0.0.1:8000/entropy/24
+    #     python entropyservice.py data/clean_manufacturing_edges.txt unix:/tmp/entropy.sock
+    #     curl --unix-socket /tmp/entropy.sock http://localhost/entropy/24
+    filename = sys.argv[1] if len(sys.argv) > 1 else "data/clean_manufacturing_edges.txt"
+    address = sys.argv[2] if len(sys.argv) > 2 else "127.0.0.1:8000"
+    try:
+        asyncio.run(_main(filename, address))
+    except KeyboardInterrupt:
+        pass
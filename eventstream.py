@@ -0,0 +1,282 @@
+# Live ingestion of station passage events into manufacturing paths
+# Date: 18/10/2026
+# ======================
+#
+# Streaming counterpart of from_timestamp_to_paths.py. Events arrive as
+# lines "item station timestamp" while the shift is running, from a file
+# that is being appended to (tail_file) or from a local Unix socket
+# (serve_socket). PathAssembler keeps the open path of every item in an
+# OrderedDict ordered by last activity. An item is complete when no event
+# arrived for it during timeout (in time-stamp units, measured against the
+# latest time-stamp seen); events may arrive out of order, so the items are
+# also kept in a heap by their latest time-stamp, whose outdated entries are
+# skipped when they come out. When more than max_open items are open the
+# least recently active ones are completed early. The stations of a
+# complete item are ordered by their mean time-stamp, ties broken by their
+# '_S<n>_' string, as in timestamp_ingestion.TimestampParser, and the path
+# and edge counters (with the dummy 'i' and 'f' nodes of edges_from_paths)
+# are updated at once, so a snapshot only writes the counters.
+#
+# Snapshots are written periodically in the GraphFile formats (paths with
+# count and edges) to temporary files that replace the previous snapshot
+# with os.replace, so readers never see a half written file.
+from collections import OrderedDict
+from heapq import heapify, heappush, heappop
+import asyncio
+import os
+import signal
+import sys
+from graphfile import GraphFile
+
+
+class PathAssembler:
+    def __init__(self, timeout=float('inf'), max_open=10**6):
+        '''Initialize the assembler. Input variables:
+        - timeout: an item whose last event is older than timeout (in
+        time-stamp units) with respect to the latest time-stamp seen is
+        complete,
+        - max_open: maximum number of open items; the least recently active
+        items are completed when there are more.'''
+        self.timeout = timeout
+        self.max_open = max_open
+        self.open_paths = OrderedDict()
+        # (latest time-stamp, item) of the open items, with outdated entries.
+        self._deadlines = []
+        self.paths = dict()
+        self.edges = dict()
+        self.clock = float('-inf')
+        self.events = 0
+        self.completed = 0
+        self.evicted = 0
+        self.malformed = 0
+
+
+    def add(self, item, station, timestamp):
+        '''Add the passage of item through station at timestamp.'''
+        open_paths = self.open_paths
+        record = open_paths.get(item)
+        if record is None:
+            record = open_paths[item] = [timestamp, dict()]
+            self._push(timestamp, item)
+            if len(open_paths) > self.max_open:
+                self.evicted += 1
+                self._complete(*open_paths.popitem(last=False))
+        else:
+            open_paths.move_to_end(item)
+            if timestamp > record[0]:
+                record[0] = timestamp
+                self._push(timestamp, item)
+        times = record[1].get(station)
+        if times is None:
+            record[1][station] = [timestamp, 1]
+        else:
+            times[0] += timestamp
+            times[1] += 1
+        if timestamp > self.clock:
+            self.clock = timestamp
+        self.events += 1
+
+
+    def add_lines(self, lines):
+        '''Add the events of lines ("item station timestamp") and complete
+        the items that timed out. Malformed lines are counted and skipped.
+        Returns the number of events added.'''
+        events = self.events
+        add = self.add
+        for line in lines:
+            fields = line.split()
+            try:
+                add(fields[0], int(fields[1]), float(fields[2]))
+            except (IndexError, ValueError):
+                if fields:
+                    self.malformed += 1
+        self.expire()
+        return self.events - events
+
+
+    def _push(self, timestamp, item):
+        '''Add (timestamp, item) to the heap of deadlines. The heap is
+        rebuilt from the open items when most of its entries are outdated.'''
+        deadlines = self._deadlines
+        if len(deadlines) > 2 * len(self.open_paths) + 1024:
+            deadlines[:] = [(record[0], i) for i, record in self.open_paths.items()]
+            heapify(deadlines)
+        heappush(deadlines, (timestamp, item))
+
+
+    def expire(self, now=None):
+        '''Complete the items idle for longer than timeout at time now (the
+        latest time-stamp seen by default), whatever the order their events
+        arrived in. Returns the number of items completed.'''
+        if now is None:
+            now = self.clock
+        open_paths = self.open_paths
+        deadlines = self._deadlines
+        deadline = now - self.timeout
+        completed = 0
+        while deadlines and deadlines[0][0] < deadline:
+            timestamp, item = heappop(deadlines)
+            record = open_paths.get(item)
+            if record is None or record[0] != timestamp:
+                # Completed already, or active again later.
+                continue
+            del open_paths[item]
+            self._complete(item, record)
+            completed += 1
+        return completed
+
+
+    def flush(self):
+        '''Complete all the open items (e.g. at the end of the shift).'''
+        while self.open_paths:
+            self._complete(*self.open_paths.popitem(last=False))
+        self._deadlines = []
+        return True
+
+
+    def _complete(self, item, record):
+        '''Count the path of a complete item and its edges.'''
+        stations = record[1]
+        path = tuple(sorted(stations, key=lambda s: (stations[s][0] / stations[s][1],
+                                                     '_S{}_'.format(s))))
+        self.paths[path] = self.paths.get(path, 0) + 1
+        edges = self.edges
+        for e in [('i', path[0])] + list(zip(path, path[1:])) + [(path[-1], 'f')]:
+            edges[e] = edges.get(e, 0) + 1
+        self.completed += 1
+
+
+    def snapshot(self, paths_filename, edges_filename):
+        '''Write the counts of the complete paths and their edges in the
+        formats of GraphFile.write_paths_with_count and write_graph_to_file.
+        Every file is replaced at once.'''
+        for filename, method, counts in ((paths_filename, 'write_paths_with_count', self.paths),
+                                         (edges_filename, 'write_graph_to_file', self.edges)):
+            directory, name = os.path.split(filename)
+            temporary = os.path.join(directory, '.tmp-' + name)
+            getattr(GraphFile(temporary), method)(counts)
+            os.replace(temporary, filename)
+        return True
+
+
+    def stats(self):
+        '''Dictionary with the counters of the assembler.'''
+        return {'events': self.events, 'open': len(self.open_paths),
+                'completed': self.completed, 'evicted': self.evicted,
+                'malformed': self.malformed, 'paths': len(self.paths),
+                'edges': len(self.edges)}
+
+
+
+async def tail_file(filename, assembler, poll_interval=0.5, stop=None,
+                    block_size=2**20):
+    '''Add the events of a file that is being appended to. Complete lines
+    are read in blocks; at the end of the file it waits poll_interval
+    seconds for more. Returns when stop (an asyncio.Event) is set and the
+    file has been read to its end, or at the end of the file if stop is
+    None.'''
+    with open(filename) as f:
+        rest = ''
+        while True:
+            block = f.read(block_size)
+            if block:
+                block = rest + block
+                end = block.rfind('\n') + 1
+                rest = block[end:]
+                assembler.add_lines(block[:end].splitlines())
+                await asyncio.sleep(0)
+                continue
+            if stop is None or stop.is_set():
+                break
+            await asyncio.sleep(poll_interval)
+        if rest:
+            assembler.add_lines([rest])
+    return assembler.events
+
+
+
+async def serve_socket(path, assembler, block_size=2**16):
+    '''Serve a Unix socket at path; every connection sends event lines.
+    Returns the asyncio server (close it to stop).'''
+    async def handle(reader, writer):
+        rest = b''
+        while True:
+            block = await reader.read(block_size)
+            if not block:
+                break
+            block = rest + block
+            end = block.rfind(b'\n') + 1
+            rest = block[end:]
+            assembler.add_lines(block[:end].decode().splitlines())
+        if rest:
+            assembler.add_lines([rest.decode()])
+        writer.close()
+
+    if os.path.exists(path):
+        os.remove(path)
+    return await asyncio.start_unix_server(handle, path)
+
+
+
+async def publish_snapshots(assembler, paths_filename, edges_filename, interval=60,
+                            stop=None):
+    '''Write a snapshot every interval seconds until stop (an asyncio.Event)
+    is set.'''
+    while True:
+        if stop is None:
+            await asyncio.sleep(interval)
+        else:
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+                return True
+            except asyncio.TimeoutError:
+                pass
+        assembler.expire()
+        assembler.snapshot(paths_filename, edges_filename)
+
+
+
+async def ingest(source, paths_filename, edges_filename, timeout=float('inf'),
+                 max_open=10**6, interval=60, follow=True, stop=None):
+    '''Ingest events from source (a file, tailed if follow is True, or
+    'unix:<path>' for a Unix socket) and publish snapshots every interval
+    seconds until stop is set. Open items are completed before the last
+    snapshot. Returns the PathAssembler.'''
+    assembler = PathAssembler(timeout, max_open)
+    if stop is None:
+        stop = asyncio.Event()
+    publisher = asyncio.ensure_future(publish_snapshots(
+        assembler, paths_filename, edges_filename, interval, stop))
+    if source.startswith('unix:'):
+        server = await serve_socket(source[len('unix:'):], assembler)
+        async with server:
+            await stop.wait()
+    else:
+        await tail_file(source, assembler, stop=stop if follow else None)
+        stop.set()
+    await publisher
+    assembler.flush()
+    assembler.snapshot(paths_filename, edges_filename)
+    return assembler
+
+
+
+async def _main(source):
+    '''Ingest events until SIGINT or SIGTERM.'''
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+    assembler = await ingest(source, "data/live_manufacturing_paths.txt",
+                             "data/live_manufacturing_edges.txt", timeout=3600, stop=stop)
+    print(assembler.stats())
+
+
+
+if __name__ == "__main__":
+    # Ingest events until interrupted (Ctrl+C), e.g.
+    #     python eventstream.py data/events.txt
+    #     python eventstream.py unix:/tmp/events.sock
+    # Snapshots go to data/live_manufacturing_paths.txt and
+    # data/live_manufacturing_edges.txt every minute and when it stops.
+    asyncio.run(_main(sys.argv[1]))
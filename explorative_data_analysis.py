@@ -3,7 +3,7 @@
 # Data used in this file: pre-processed ("data/clean_manufacturing_paths.txt" and "data/clean_manufacturing_edges.txt")
 # Yamila Mariel Omar
 # Date of original code: 6th August 2020
-# Date of code last modification: 6th August 2020
+# Date of code last modification: 18th October 2026
 
 # Explorative data analysis
 
@@ -25,6 +25,7 @@ if __name__ == "__main__":
     # =====================
     from graphfile import GraphFile
     from graph import Graph
+    from pathtrie import PathTrie
     import datetime
     import matplotlib.pyplot as plt
 
@@ -35,6 +36,7 @@ if __name__ == "__main__":
     filename_edges = "data/clean_manufacturing_edges.txt"
     edges = GraphFile(filename_edges).read_edges_from_file()
     paths = GraphFile(filename_paths).read_paths_with_count()
+    trie = PathTrie(paths)
 
     # Generate graph from clean edges
     # ===============================
@@ -45,11 +47,10 @@ if __name__ == "__main__":
     # Get frequency of n in paths
     # ==========================================================================
     freq_n_in_paths = {n:0 for n in G.nodes}
-    for p,v in paths.items():
-        for n in p:
-            freq_n_in_paths[n] += v
+    for n,v in trie.node_counts().items():
+        freq_n_in_paths[n] += v
 
-    number_of_paths = sum(list(paths.values()))
+    number_of_paths = trie.number_of_items
     freq_n_in_paths = {k:v/number_of_paths for k,v in freq_n_in_paths.items()}
 
     # Make plot
@@ -72,10 +73,7 @@ if __name__ == "__main__":
     # ==========================================================================
     # Get frequency of n as start node
     # ==========================================================================
-    freq_start_nodes = dict()
-    for p,v in paths.items():
-        i = p[0]
-        freq_start_nodes[i] = freq_start_nodes.get(i, 0) + v
+    freq_start_nodes = trie.start_counts()
 
     freq_start_nodes = {k:v/number_of_paths for k,v in freq_start_nodes.items()}
 
@@ -98,10 +96,7 @@ if __name__ == "__main__":
     # ==========================================================================
     # Get frequency of n as end node
     # ==========================================================================
-    freq_end_nodes = dict()
-    for p,v in paths.items():
-        i = p[-1]
-        freq_end_nodes[i] = freq_end_nodes.get(i, 0) + v
+    freq_end_nodes = trie.end_counts()
 
     freq_end_nodes = {k:v/number_of_paths for k,v in freq_end_nodes.items()}
 
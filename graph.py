@@ -1,7 +1,8 @@
 # Entropy Centrality
 # Author: Yamila M. Omar
 # Date: 5/4/2019
-from math import log
+from csrgraph import CSRGraph, node_entropy
+from resultcache import cache_key
 
 class Graph:
     def __init__(self, edges=dict()):
@@ -9,30 +10,182 @@ class Graph:
             - edges: dictionary with edge tuples as keys (i,j) and
             weight w_ij as values.'''
         self.edges = edges
+        self._csr = CSRGraph(edges)
         self.nodes = self._get_set_of_nodes()
         self.downstream_nodes = self._get_downstream_nodes()
         self.downstream_strength = self._get_downstream_strength()
+        self.upstream_nodes = self._get_upstream_nodes()
+        self.invalidated_sources = set()
         self.all_paths = {}
+        self.instrumentation = None
+        self.cache = None
+        self._cache_keys = None
+
+
+    @property
+    def csr(self):
+        '''CSR graph of the current edges. It is rebuilt, when needed, after
+        addEdge or deleteEdge.'''
+        if self._csr is None:
+            self._csr = CSRGraph(self.edges)
+        return self._csr
 
 
     def _get_set_of_nodes(self):
         '''Find the nodes from the edges.'''
-        edges = list(self.edges.keys())
-        nodes = [i[0] for i in edges] + [i[1] for i in edges]
-        return set(nodes)
+        return set(self.csr.labels)
+
+
+    def _get_upstream_nodes(self):
+        '''This function returns the set of upstream nodes of each node in
+        the graph. It is used to assign this value to an attribute.'''
+        upstream = {n:set() for n in self.nodes}
+        for (i,j) in self.edges.keys():
+            upstream[j].add(i)
+        return upstream
+
+
+    def _add_node(self, n):
+        '''Add node n to the nodes and the derived indexes.'''
+        if n not in self.nodes:
+            self.nodes.add(n)
+            self.downstream_nodes[n] = []
+            self.downstream_strength[n] = 0
+            self.upstream_nodes[n] = set()
+            self.invalidated_sources.add(n)
+
+
+    def _remove_node_if_isolated(self, n):
+        '''Remove node n from the nodes and the derived indexes once it has
+        no edges left.'''
+        if len(self.downstream_nodes[n]) == 0 and len(self.upstream_nodes[n]) == 0:
+            self.nodes.discard(n)
+            del self.downstream_nodes[n]
+            del self.downstream_strength[n]
+            del self.upstream_nodes[n]
+            self.invalidated_sources.discard(n)
+
+
+    def sources_reaching(self, i):
+        '''Return the set of nodes from which node i can be reached (i
+        included). Their p_ij depend on the edges out of i.'''
+        return self._sources_reaching_any([i])
+
+
+    def _sources_reaching_any(self, nodes):
+        '''Return the set of nodes from which any of nodes can be reached
+        (nodes included), with a single upstream search.'''
+        reaching = set(nodes)
+        stack = list(reaching)
+        while stack:
+            t = stack.pop()
+            for u in self.upstream_nodes.get(t, ()):
+                if u not in reaching:
+                    reaching.add(u)
+                    stack.append(u)
+        return reaching
 
 
     def addEdge(self, i, j, w_ij):
-        '''Allows to add and edge (i,j) and its weight w_ij to the graph'''
+        '''Allows to add and edge (i,j) and its weight w_ij to the graph (or
+        to change the weight of an existing edge). The derived indexes are
+        updated in O(degree of i) and the sources that can reach i are
+        added to invalidated_sources.'''
+        self._add_node(i)
+        self._add_node(j)
+        if (i,j) not in self.edges:
+            self.downstream_nodes[i].append(j)
+            self.upstream_nodes[j].add(i)
         self.edges[(i,j)] = w_ij
+        self.downstream_strength[i] = sum(self.edges[(i,v)] for v in self.downstream_nodes[i])
+        self.invalidated_sources.update(self.sources_reaching(i))
+        self._csr = None
 
 
     def deleteEdge(self, i, j):
-        '''Allows to delete an edge (i,j) and its associated weight'''
+        '''Allows to delete an edge (i,j) and its associated weight. The
+        derived indexes are updated in O(degree of i) and the sources that
+        can reach i are added to invalidated_sources.'''
         try:
             self.edges.pop((i,j))
         except KeyError:
             print("{0} cannot be deleted. {0} in Graph.".format((i,j)))
+            return
+        self.invalidated_sources.update(self.sources_reaching(i))
+        self.downstream_nodes[i].remove(j)
+        self.upstream_nodes[j].discard(i)
+        self.downstream_strength[i] = sum(self.edges[(i,v)] for v in self.downstream_nodes[i])
+        self._remove_node_if_isolated(i)
+        if j != i:
+            self._remove_node_if_isolated(j)
+        self._csr = None
+
+
+    def update_edges(self, updates):
+        '''Apply several edge updates at once: updates is an iterable of
+        tuples (i, j, w_ij), with w_ij None to delete the edge (i,j). The
+        graph is that of addEdge and deleteEdge called one by one, but the
+        sources that can reach the edited edges (in the new graph) are found
+        with a single upstream search. Returns the set of tails i of the edited edges.'''
+        tails, heads = set(), set()
+        for i, j, w_ij in updates:
+            if w_ij is None:
+                if (i,j) not in self.edges:
+                    print("{0} cannot be deleted. {0} in Graph.".format((i,j)))
+                    continue
+                self.edges.pop((i,j))
+                self.downstream_nodes[i].remove(j)
+                self.upstream_nodes[j].discard(i)
+                heads.add(j)
+            else:
+                self._add_node(i)
+                self._add_node(j)
+                if (i,j) not in self.edges:
+                    self.downstream_nodes[i].append(j)
+                    self.upstream_nodes[j].add(i)
+                self.edges[(i,j)] = w_ij
+            tails.add(i)
+        for i in tails:
+            self.downstream_strength[i] = sum(self.edges[(i,v)] for v in self.downstream_nodes[i])
+        self.invalidated_sources.update(self._sources_reaching_any(tails))
+        for n in tails | heads:
+            if n in self.nodes:
+                self._remove_node_if_isolated(n)
+        self._csr = None
+        return tails
+
+
+    def pop_invalidated_sources(self):
+        '''Return the sources whose p_ij (and entropy) changed since the last
+        call (or since the Graph was initialized) and reset the set.'''
+        sources = self.invalidated_sources
+        self.invalidated_sources = set()
+        return sources
+
+
+    def update_probability_paths(self, p_ij, formulation_type="Tutzauer", sources=None):
+        '''Bring p_ij (dictionary with edge tuples (i,j) as keys, as merged in
+        binary_pij.py and weighted_pij.py) up to date after addEdge and
+        deleteEdge: only the rows of the invalidated sources are calculated
+        again. Entries of deleted nodes are removed and the other rows get
+        zeros for new nodes. Input variables:
+        - p_ij: dictionary calculated for the sources, updated in place,
+        - formulation_type: "Tutzauer" by default,
+        - sources: sources of p_ij (default: all nodes).
+        The function returns the set of recalculated sources.'''
+        if sources is None:
+            sources = self.nodes
+        sources = set(sources) & self.nodes
+        for k in [k for k in p_ij if k[0] not in self.nodes or k[1] not in self.nodes]:
+            del p_ij[k]
+        rows = {i for (i,j) in p_ij}
+        stale = (self.pop_invalidated_sources() & sources) | (sources - rows)
+        for i in sources - stale:
+            for j in self.nodes:
+                p_ij.setdefault((i,j), 0)
+        for i in stale:
+            p_ij.update(self._probability_paths_from_i(i, formulation_type))
+        return stale
 
 
     def normalize(self):
@@ -76,59 +229,37 @@ class Graph:
 
     def _get_downstream_nodes_of_i(self, i):
         '''This function finds the downstream neighbours of node i.'''
-        downstream_nodes_of_i = list()
-        for edge in self.edges.keys():
-            u, v = edge[0], edge[1]
-            if u == i: downstream_nodes_of_i.append(v)
-        downstream_nodes_of_i = set(downstream_nodes_of_i)
-        return list(downstream_nodes_of_i)
+        csr = self.csr
+        return [csr.labels[v] for v in csr.downstream(csr.index[i])]
 
 
     def _get_downstream_nodes(self):
         '''This function returns the downstream nodes of each node in the
         graph. It is used to assign this value to an attribute.'''
-        downtream_nodes = dict()
-        for n in self.nodes:
-            downtream_nodes[n] = self._get_downstream_nodes_of_i(n)
-        return downtream_nodes
+        return self.csr.downstream_nodes()
 
 
     def _get_downstream_stregth_of_i(self, i):
         '''This function calculates the downstream stregth of node i.'''
-        downstream_stregth_of_i = 0
-        for edge, weight in self.edges.items():
-            if edge[0] == i:
-                downstream_stregth_of_i += weight
-        return downstream_stregth_of_i
+        return self.csr.out_strength[self.csr.index[i]]
 
     def _get_downstream_strength(self):
         '''This function returns the downstream strength of each node in the
         graph. It is used to assign this value to an attribute.'''
-        downstream_stregth = dict()
-        for n in self.nodes:
-            downstream_stregth[n] = self._get_downstream_stregth_of_i(n)
-        return downstream_stregth
+        return self.csr.downstream_strength()
 
 
     def yield_paths_from_i(self, i):
         """Find all paths from node i. This method produces a generator as
         opposed to a list of paths (obtained using the method findAllPaths).
+        If self.instrumentation is set, the paths are counted by it.
         """
-        path = [i]                  # path traversed so far
-        seen = {i}                  # set of vertices in path
-        yield path
-
-        def search():
-            for neighbour in self.downstream_nodes[path[-1]]:
-                if neighbour not in seen:
-                    seen.add(neighbour)
-                    path.append(neighbour)
-                    yield list(path)
-                    yield from search()
-                    path.pop()
-                    seen.remove(neighbour)
-
-        yield from search()
+        labels = self.csr.labels
+        paths = ([labels[n] for n in path]
+                 for path in self.csr.yield_paths_from(self.csr.index[i]))
+        if self.instrumentation is not None:
+            paths = self.instrumentation.yield_paths(paths, i)
+        yield from paths
 
 
 
@@ -210,16 +341,73 @@ class Graph:
 
 
 
+    def _self_loops(self):
+        '''Self-loop weights by CSR node id.'''
+        return list(self.csr.self_loops)
+
+
+
+    def _yield_path_probabilities_from_i(self, i, formulation_type):
+        '''Find all paths from node i and yield a tuple (j, product) with the
+        end node j and the probability of each path, following the same
+        formulae as _path_probability. Paths are scored incrementally on the
+        CSR graph (see CSRGraph.yield_path_probabilities_from).'''
+        csr = self.csr
+        labels = csr.labels
+        for j, product in csr.yield_path_probabilities_from(
+                csr.index[i], formulation_type, self._self_loops()):
+            yield labels[j], product
+
+
+
+    def _cache_key(self, formulation_type):
+        '''Key of the rows of the current graph in self.cache (see
+        resultcache.cache_key). Keys are recalculated after the graph is
+        edited.'''
+        csr = self.csr
+        if self._cache_keys is None or self._cache_keys[0] is not csr:
+            self._cache_keys = (csr, dict())
+        keys = self._cache_keys[1]
+        if formulation_type not in keys:
+            keys[formulation_type] = cache_key(csr, self._self_loops(), formulation_type)
+        return keys[formulation_type]
+
+
+
+    def _probability_row_from_i(self, i, formulation_type):
+        '''Calculate the probabilities i -> j as a list indexed by the CSR
+        node ids. If self.instrumentation is set, the enumeration is
+        measured by it. If self.cache (a ResultCache) is set, the row is
+        read from it when it was calculated before and stored in it
+        otherwise.'''
+        csr = self.csr
+        if self.cache is not None:
+            key = self._cache_key(formulation_type)
+            row = self.cache.get_row(key, i)
+            if row is not None:
+                return row
+        if self.instrumentation is not None:
+            row = self.instrumentation.probability_row(
+                csr, csr.index[i], i, formulation_type, self._self_loops())
+        else:
+            row = csr.probability_paths_from(csr.index[i], formulation_type,
+                                             self._self_loops())
+        if self.cache is not None:
+            self.cache.put_row(key, i, row)
+        return row
+
+
+
     def _probability_paths_from_i(self, i, formulation_type):
         '''Calculate all the probabilities i -> j for all j in G. This
         done following the general formulae on Tutzauer (2007). This
         function differs from _probability_path_ij in that it uses a
         generator to obtain paths instead of calculating them and storing
-        them on RAM.'''
+        them on RAM. Paths are enumerated on the CSR graph.'''
         prob_ij = {(i,j):0 for j in self.nodes}
-        for path in self.yield_paths_from_i(i):
-            i, j, product = self._path_probability(path, formulation_type)
-            prob_ij[(i,j)] += product
+        p_j = self._probability_row_from_i(i, formulation_type)
+        for j, product in zip(self.csr.labels, p_j):
+            prob_ij[(i,j)] = product
         return prob_ij
 
 
@@ -257,13 +445,8 @@ class Graph:
         i: node in graph.
         formulation_type: "Tutzauer" by default. It follows Tutzauer's
         formulation. Any other value, follows the proposed formulation.'''
-        C_H = 0
-        p_ij = self._probability_paths_from_i(i, formulation_type)
-        p_ij = self._normalize_p_ij(p_ij)
-        for j in self.nodes:
-            if p_ij[(i,j)] != 0:
-                C_H = C_H + p_ij[(i,j)] * log(p_ij[(i,j)], 2)
-        C_H = - C_H
+        p_j = self._probability_row_from_i(i, formulation_type)
+        C_H = node_entropy(p_j)
         return (i, C_H)
 
 
@@ -271,31 +454,31 @@ class Graph:
     @property
     def adjacencyList(self):
         '''Returns the adjacency list.'''
-        ingoing, outgoing = {k:[] for k in self.nodes}, {k:[] for k in self.nodes}
-        for edge in self.edges.keys():
-            i, j = edge[0], edge[1]
-            outgoing[i] = outgoing.get(i, []) + [j]
-            ingoing[j] = ingoing.get(j, []) + [i]
-        ingoing = {k:set(v) for k,v in ingoing.items()}
-        outgoing = {k:set(v) for k,v in outgoing.items()}
+        csr = self.csr
+        labels, indptr, indices = csr.labels, csr.indptr, csr.indices
+        ingoing, outgoing = {k:set() for k in labels}, {k:set() for k in labels}
+        for u in range(len(labels)):
+            for v in indices[indptr[u]:indptr[u + 1]]:
+                outgoing[labels[u]].add(labels[v])
+                ingoing[labels[v]].add(labels[u])
         return ingoing, outgoing
 
 
     @property
     def degree(self):
         '''Calculate the degree of each node.'''
-        ingoing, outgoing = self.adjacencyList
-        inDegree = {k:len(ingoing[k]) if k in ingoing else 0 for k in self.nodes}
-        outDegree = {k:len(outgoing[k]) if k in outgoing else 0 for k in self.nodes}
+        csr = self.csr
+        in_degree, out_degree = csr.degree()
+        inDegree = dict(zip(csr.labels, in_degree))
+        outDegree = dict(zip(csr.labels, out_degree))
         return inDegree, outDegree
 
 
     @property
     def strength(self):
         '''Calculate the strength of each node.'''
-        inStrength, outStrength = {k:0 for k in self.nodes}, {k:0 for k in self.nodes}
-        for edge,weight in self.edges.items():
-            i, j = edge[0], edge[1]
-            inStrength[j] = inStrength[j] + weight
-            outStrength[i] = outStrength[i] + weight
+        csr = self.csr
+        in_strength, out_strength = csr.strength()
+        inStrength = dict(zip(csr.labels, in_strength))
+        outStrength = dict(zip(csr.labels, out_strength))
         return inStrength, outStrength
@@ -2,6 +2,70 @@
 # Author: Yamila M. Omar
 # Date: 4/4/2019
 # ======================
+#
+# Files are read in blocks of whole lines (BLOCK_SIZE characters at a time)
+# and node tokens are converted through a dictionary, so that every
+# distinct token (a file has few distinct nodes) is converted only once.
+# Nodes are integers, except for the dummy start and end nodes 'i' and 'f'
+# of the edges files, which are kept as strings. p_ij files are parsed in
+# bulk into NumPy arrays (read_probs_as_arrays). Writers format BLOCK_LINES
+# lines at a time, converting every node to a string once, and write every
+# block with a single call. Read blocks and buffers are no larger than the
+# file, so small files do not pay for them.
+#
+# Files whose name ends in .gz, .bz2, .xz or .lzma are compressed and
+# decompressed on the fly with the standard library; .zst files need the
+# zstandard package (or Python's compression.zstd).
+import bz2
+import gzip
+from itertools import islice
+import lzma
+import os
+import numpy as np
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+
+
+DUMMY_NODES = ('i', 'f')
+BLOCK_SIZE = 2**12
+BLOCK_LINES = 2**16
+_BUFFER_SIZE = 2**16
+_COMPRESSION = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open, '.lzma': lzma.open}
+
+
+def _node(token):
+    '''Node of a token: an integer, or the token itself for the dummy nodes
+    (and any other non-integer label).'''
+    if token in DUMMY_NODES:
+        return token
+    try:
+        return int(token)
+    except ValueError:
+        return token
+
+
+
+class _Nodes(dict):
+    '''Dictionary token -> node that converts every new token with _node.'''
+    def __missing__(self, token):
+        node = self[token] = _node(token)
+        return node
+
+
+
+class _Labels(dict):
+    '''Dictionary node -> str(node) that converts every new node once.'''
+    def __missing__(self, node):
+        label = self[node] = str(node)
+        return label
+
+
 
 class GraphFile:
     def __init__(self, fileName):
@@ -9,30 +73,72 @@ class GraphFile:
         self.filename = fileName
 
 
+    def open(self, mode='r'):
+        '''Open the file in text mode ('r', 'w' or 'a'), compressed according
+        to its extension.'''
+        for suffix, opener in _COMPRESSION.items():
+            if self.filename.endswith(suffix):
+                return opener(self.filename, mode + 't')
+        if self.filename.endswith('.zst'):
+            if zstd is None:
+                raise ValueError("Reading or writing {} needs the zstandard package.".format(self.filename))
+            return zstd.open(self.filename, mode + 't')
+        if mode == 'r':
+            return open(self.filename, mode, buffering=min(_BUFFER_SIZE, self._size() + 1))
+        return open(self.filename, mode)
+
+
+    def _size(self):
+        '''Size in bytes of the file, or None if it is compressed (its
+        decompressed size is not known).'''
+        if self.filename.endswith(tuple(_COMPRESSION) + ('.zst',)):
+            return None
+        return os.path.getsize(self.filename)
+
+
+    def _blocks(self, block_size=BLOCK_SIZE):
+        '''Yield the lines of the file in blocks (lists of lines) of about
+        block_size characters (at most the size of the file).'''
+        size = self._size()
+        if size is not None:
+            block_size = min(block_size, size + 1)
+        with self.open() as f:
+            rest = ''
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                block = rest + block
+                end = block.rfind('\n') + 1
+                rest = block[end:]
+                yield block[:end].splitlines()
+            if rest:
+                yield rest.splitlines()
+
+
+    def _write_lines(self, lines):
+        '''Write an iterable of lines (ending in a new line character) in
+        blocks of BLOCK_LINES lines.'''
+        lines = iter(lines)
+        with self.open('w') as f:
+            block = list(islice(lines, BLOCK_LINES))
+            while block:
+                f.write(''.join(block))
+                block = list(islice(lines, BLOCK_LINES))
+        return True
+
+
     def read_edges_from_file(self):
         '''Read graph from file. The file contains one edge (i,j)
         and its weight w_ij per line as follows:
         i j w_ij'''
         edges = {}
-        with open(self.filename) as fileHandle:
-            for line in fileHandle:
-                line = line.strip().split()
+        nodes = _Nodes()
+        for lines in self._blocks():
+            for line in lines:
+                line = line.split()
                 if len(line) != 3: continue
-                i, j, w_ij = line[0], line[1], line[2]
-
-                try:
-                    i = int(i)
-                except ValueError:
-                    pass
-
-                try:
-                    j = int(j)
-                except ValueError:
-                    pass
-
-                w_ij = int(w_ij)
-                edges[(i,j)] = w_ij
-
+                edges[(nodes[line[0]], nodes[line[1]])] = int(line[2])
         return edges
 
 
@@ -40,11 +146,50 @@ class GraphFile:
     def write_graph_to_file(self, G):
         '''Write graph G to file. G must be a dictionary.
         Keys are tuples (i,j) of edges and values are weights w_ij.'''
-        with open(self.filename, 'w') as f:
-            for k,v in G.items():
-                i, j, w_ij = str(k[0]), str(k[1]), str(v)
-                f.write(i + ' ' + j + ' ' + w_ij + '\n')
-        return True
+        labels = _Labels()
+        return self._write_lines(labels[k[0]] + ' ' + labels[k[1]] + ' ' + str(v) + '\n'
+                                 for k,v in G.items())
+
+
+
+    def read_probs_from_file(self):
+        '''Read path probabilities p_ij from file. The file contains one pair
+        of nodes (i,j) and its probability p_ij per line as follows:
+        i j p_ij
+        Returns a dictionary of probabilities with (i,j) keys and the set of
+        nodes. Lines that cannot be read are printed and left out.'''
+        try:
+            i, j, p = self.read_probs_as_arrays()
+            p_ij = dict(zip(zip(i.tolist(), j.tolist()), p.tolist()))
+        except ValueError:
+            # Not a file of integer nodes and probabilities only: read it
+            # line by line.
+            p_ij = dict()
+            nodes = _Nodes()
+            for lines in self._blocks():
+                for line in lines:
+                    line = line.strip().split(" ")
+                    try:
+                        p_ij[(nodes[line[0]], nodes[line[1]])] = float(line[2])
+                    except (IndexError, ValueError):
+                        print(line)
+        return p_ij, {n for k in p_ij for n in k}
+
+
+
+    def read_probs_as_arrays(self):
+        '''Read path probabilities p_ij between integer nodes as NumPy
+        arrays i, j (int64) and p_ij (float64), one entry per line.'''
+        with self.open() as f:
+            values = np.loadtxt(f, dtype=float, ndmin=2)
+        if values.size == 0:
+            values = np.zeros((0, 3))
+        if values.shape[1] != 3:
+            raise ValueError("{} is not a file of p_ij values.".format(self.filename))
+        i, j = values[:, 0].astype(np.int64), values[:, 1].astype(np.int64)
+        if (i != values[:, 0]).any() or (j != values[:, 1]).any():
+            raise ValueError("{} has non-integer nodes.".format(self.filename))
+        return i, j, values[:, 2]
 
 
 
@@ -53,17 +198,11 @@ class GraphFile:
         one node per line and its centrality value as follows:
         i c_i'''
         C = {}
-        with open(self.filename) as f:
-            for line in f:
-                line = line.strip().split()
-                i, c_i = line[0], float(line[1])
-
-                try:
-                    i = int(i)
-                except ValueError:
-                    pass
-
-                C[i] = c_i
+        nodes = _Nodes()
+        for lines in self._blocks():
+            for line in lines:
+                line = line.split()
+                C[nodes[line[0]]] = float(line[1])
         return C
 
 
@@ -71,36 +210,28 @@ class GraphFile:
     def write_centrality_values_to_file(self, C):
         '''Write centrality values to file. C must be a dictionary.
         Keys are nodes i and values are centrality values c_i.'''
-        with open(self.filename, 'w') as f:
-            for k,v in C.items():
-                i, c_i = str(k), str(v)
-                f.write(i + ' ' + c_i + '\n')
-        return True
+        labels = _Labels()
+        return self._write_lines(labels[k] + ' ' + str(v) + '\n' for k,v in C.items())
 
 
     def write_paths_to_file(self, paths_list):
         '''Write a list of paths to file. paths_list must be a list of paths.
         Each individual path is saved in a different line.'''
-        with open(self.filename, 'w') as f:
-            for p in paths_list:
-                p = [str(n) for n in p]
-                s = ' '.join(p)
-                f.write(s + '\n')
-        return True
+        labels = _Labels()
+        return self._write_lines(' '.join(map(labels.__getitem__, p)) + '\n' for p in paths_list)
 
 
 
     def read_paths_from_file(self):
         '''Read paths from file. They must be saved in the format given by
         the write_paths_to_file method.'''
-        with open(self.filename) as f:
-            all_paths = dict()
-            for line in f:
-                line = line.strip().split(' ')
-                line = [int(x) for x in line]
+        all_paths = dict()
+        nodes = _Nodes()
+        for lines in self._blocks():
+            for line in lines:
+                line = list(map(nodes.__getitem__, line.split()))
                 i, j = line[0], line[-1]
-                all_paths[(i,j)] = all_paths.get((i,j), [])
-                all_paths[(i,j)].append(line)
+                all_paths.setdefault((i,j), []).append(line)
         return all_paths
 
 
@@ -109,13 +240,13 @@ class GraphFile:
         path per line as nodes separated with whitespace and the last value is
         the count. Example:
         1 2 3 4 5 6 1000 '''
-        with open(self.filename) as f:
-            all_paths = dict()
-            for line in f:
-                line = line.strip().split(' ')
-                line = [int(x) for x in line]
-                path, count = tuple(line[0:-1]), line[-1]
-                all_paths[path] = all_paths.get(path, 0) + count
+        all_paths = dict()
+        nodes = _Nodes()
+        for lines in self._blocks():
+            for line in lines:
+                line = line.split()
+                path = tuple([nodes[n] for n in line[:-1]])
+                all_paths[path] = all_paths.get(path, 0) + int(line[-1])
         return all_paths
 
 
@@ -124,9 +255,29 @@ class GraphFile:
         path per line as nodes separated with whitespace and the last value is
         the count. Example:
         1 2 3 4 5 6 1000 '''
-        with open(self.filename, 'w') as f:
-            for path,count in paths_with_count_dict.items():
-                line = [str(n) for n in path] + [str(count)]
-                line = ' '.join(line)
-                f.write(line + '\n')
-        return True
+        labels = _Labels()
+        return self._write_lines(' '.join([*map(labels.__getitem__, path), str(count)]) + '\n'
+                                 for path,count in paths_with_count_dict.items())
+
+
+    def write_path_records(self, records):
+        '''Write per-item path records to file. records must be an iterable
+        of tuples (item, completion, path) with the item id, its completion
+        time and its path. Each record is saved in a different line as
+        follows:
+        item completion s1 s2 ... sn'''
+        labels = _Labels()
+        return self._write_lines(' '.join([str(item), str(t), *map(labels.__getitem__, path)]) + '\n'
+                                 for item, t, path in records)
+
+
+    def read_path_records(self):
+        '''Read per-item path records from file, saved in the format given by
+        the write_path_records method. This method produces a generator of
+        tuples (item, completion, path), so the file is never loaded whole.'''
+        nodes = _Nodes()
+        for lines in self._blocks():
+            for line in lines:
+                line = line.split()
+                if len(line) < 3: continue
+                yield int(line[0]), float(line[1]), tuple([nodes[n] for n in line[2:]])
@@ -63,9 +63,13 @@ def plot_heatmap(p_ij_array, nodes, title, filename, text, clim_max):
 
 # =============================================================================
 def reduce_p_ij(nodes, p_ij):
-    ''' '''
+    '''Normalize the rows of p_ij (rounded to 3 decimals) and keep the non-zero
+    probabilities. The row sums are accumulated in one pass over p_ij.'''
+    row_sum = dict()
+    for k,v in p_ij.items():
+        row_sum[k[0]] = row_sum.get(k[0], 0) + v
     for i in nodes:
-        sum_i = sum([v for k,v in p_ij.items() if k[0] == i])
+        sum_i = row_sum.get(i, 0)
         if sum_i != 0:
             for j in nodes:
                 p_ij[(i,j)] = round(p_ij[(i,j)] / sum_i, 3)
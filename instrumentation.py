@@ -0,0 +1,196 @@
+# Opt-in instrumentation of path enumeration
+# Date: 18/10/2026
+# ======================
+#
+# An Instrumentation object can be attached to a Graph (G.instrumentation)
+# or passed to WorkStealingScheduler. It records, for every source node,
+# the number of paths, their depth histogram (number of edges), the
+# probability mass covered and the wall time, and for every worker process
+# its busy time and peak memory. Records are written as JSON lines and a
+# progress line is refreshed on stderr. Nothing is measured when no
+# Instrumentation is attached.
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_memory():
+    '''Peak resident memory of the current process in kB (None if it cannot
+    be measured on this platform).'''
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def instrumented_task(csr, prefix, formulation_type, p_j, self_loops=None,
+                      max_paths=None):
+    '''Run CSRGraph.probability_paths_from_prefix collecting statistics.
+    Returns the frontier and a dictionary of statistics: paths,
+    depth_counts, mass, wall_time, worker (pid) and peak_memory.'''
+    depth_counts = [0] * len(csr)
+    mass_before = sum(p_j)
+    start = time.perf_counter()
+    frontier, paths = csr.probability_paths_from_prefix(
+        prefix, formulation_type, p_j, self_loops, max_paths, depth_counts)
+    wall_time = time.perf_counter() - start
+    while depth_counts and depth_counts[-1] == 0:
+        depth_counts.pop()
+    stats = {'paths': paths, 'depth_counts': depth_counts,
+             'mass': sum(p_j) - mass_before, 'wall_time': wall_time,
+             'worker': os.getpid(), 'peak_memory': peak_memory()}
+    return frontier, stats
+
+
+
+class Instrumentation:
+    def __init__(self, log_filename=None, progress=True, stream=None,
+                 interval=1.0, total_sources=None):
+        '''Initialize the instrumentation. Input variables:
+        - log_filename: JSON lines file for the records (None: no log),
+        - progress: whether to show a live progress line,
+        - stream: stream of the progress line (default: sys.stderr),
+        - interval: minimum number of seconds between progress updates,
+        - total_sources: number of sources expected (shown in the progress
+        line if given).'''
+        self.log = open(log_filename, 'a') if log_filename else None
+        self.progress = progress
+        self.stream = stream if stream is not None else sys.stderr
+        self.interval = interval
+        self.total_sources = total_sources
+        self.start = time.perf_counter()
+        self._last_progress = 0
+        self.paths = 0
+        self.sources_finished = 0
+        self.mass = 0
+        self.depth_counts = []
+        self.sources = dict()
+        self.workers = dict()
+
+
+    def _write(self, event, **fields):
+        '''Write one JSON line record.'''
+        if self.log is None:
+            return
+        record = {'event': event, 'time': time.time()}
+        record.update(fields)
+        self.log.write(json.dumps(record) + '\n')
+        self.log.flush()
+
+
+    def _show_progress(self, force=False):
+        '''Refresh the progress line.'''
+        if not self.progress:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_progress < self.interval:
+            return
+        self._last_progress = now
+        elapsed = now - self.start
+        sources = str(self.sources_finished)
+        if self.total_sources is not None:
+            sources = sources + "/" + str(self.total_sources)
+        line = "{} sources, {} paths, {:.0f} paths/s, mass {:.6g}, {:.1f} s".format(
+            sources, self.paths, self.paths / elapsed if elapsed > 0 else 0,
+            self.mass, elapsed)
+        self.stream.write("\r" + line)
+        self.stream.flush()
+
+
+    def task_finished(self, source, stats, prefix=None):
+        '''Account for a finished piece of work on source (stats as returned
+        by instrumented_task).'''
+        row = self.sources.setdefault(source, {'paths': 0, 'depth_counts': [],
+                                               'mass': 0, 'wall_time': 0})
+        row['paths'] += stats['paths']
+        row['mass'] += stats['mass']
+        row['wall_time'] += stats['wall_time']
+        for counts in (row['depth_counts'], self.depth_counts):
+            for d, n in enumerate(stats['depth_counts']):
+                if d == len(counts):
+                    counts.append(0)
+                counts[d] += n
+
+        worker = self.workers.setdefault(stats['worker'], {'tasks': 0, 'paths': 0,
+                                                           'wall_time': 0,
+                                                           'peak_memory': None})
+        worker['tasks'] += 1
+        worker['paths'] += stats['paths']
+        worker['wall_time'] += stats['wall_time']
+        if stats['peak_memory'] is not None:
+            worker['peak_memory'] = max(worker['peak_memory'] or 0, stats['peak_memory'])
+
+        self.paths += stats['paths']
+        self.mass += stats['mass']
+        if prefix is not None:
+            self._write('task', source=source, prefix=prefix, paths=stats['paths'],
+                        mass=stats['mass'], wall_time=stats['wall_time'],
+                        worker=stats['worker'])
+        self._show_progress()
+
+
+    def source_finished(self, source):
+        '''Write the record of a finished source.'''
+        self.sources_finished += 1
+        row = self.sources.pop(source, {'paths': 0, 'depth_counts': [],
+                                        'mass': 0, 'wall_time': 0})
+        self._write('source', source=source, paths=row['paths'],
+                    depth_counts=row['depth_counts'], mass=row['mass'],
+                    wall_time=row['wall_time'],
+                    paths_per_second=row['paths'] / row['wall_time'] if row['wall_time'] else None)
+        self._show_progress()
+
+
+    def probability_row(self, csr, i, source, formulation_type, self_loops=None):
+        '''Instrumented version of CSRGraph.probability_paths_from for the
+        node id i (with label source).'''
+        p_j = [0] * len(csr)
+        frontier, stats = instrumented_task(csr, [i], formulation_type, p_j, self_loops)
+        self.task_finished(source, stats)
+        self.source_finished(source)
+        return p_j
+
+
+    def yield_paths(self, paths, source):
+        '''Count the paths of a path generator (as Graph.yield_paths_from_i)
+        while they are consumed.'''
+        stats = {'paths': 0, 'depth_counts': [], 'mass': 0, 'worker': os.getpid()}
+        start = time.perf_counter()
+        for path in paths:
+            stats['paths'] += 1
+            depth = len(path) - 1
+            while len(stats['depth_counts']) <= depth:
+                stats['depth_counts'].append(0)
+            stats['depth_counts'][depth] += 1
+            yield path
+        stats['wall_time'] = time.perf_counter() - start
+        stats['peak_memory'] = peak_memory()
+        self.task_finished(source, stats)
+        self.source_finished(source)
+
+
+    def summary(self):
+        '''Dictionary with the totals and the per-worker statistics.'''
+        elapsed = time.perf_counter() - self.start
+        return {'sources': self.sources_finished, 'paths': self.paths,
+                'mass': self.mass, 'wall_time': elapsed,
+                'paths_per_second': self.paths / elapsed if elapsed > 0 else None,
+                'depth_counts': self.depth_counts,
+                'workers': {str(k):v for k,v in self.workers.items()}}
+
+
+    def close(self):
+        '''Write the summary record and end the progress line.'''
+        self._write('summary', **self.summary())
+        if self.progress:
+            self._show_progress(force=True)
+            self.stream.write("\n")
+            self.stream.flush()
+        if self.log is not None:
+            self.log.close()
+            self.log = None
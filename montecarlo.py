@@ -0,0 +1,186 @@
+# Monte Carlo estimation of p_ij and node entropy
+# Date: 18/10/2026
+# ======================
+#
+# Tutzauer's path-transfer flow is a self-avoiding random walk with
+# stopping: at node t the walk stops with probability sigma_t and moves to
+# an unvisited downstream node u with probability T_tu. p_ij is therefore
+# the probability that a walk from i stops at j ("Tutzauer") or visits j
+# (arrival formulation). Many walkers are advanced at once with NumPy.
+#
+# The probabilities out of a node add up to 1 when the downstream strength
+# of the graph includes its self-loops, as in every Graph (also for
+# self-loops added with addEdge), and then every walker has weight 1. In
+# general (self-loop weights that are not part of the downstream strength,
+# as the self_loops override of WorkStealingScheduler) the next step is
+# sampled in proportion to sigma_t and T_tu, and every walker carries the
+# product Z of the sums of these probabilities as an importance weight, so
+# that the estimates still agree with the exact p_ij.
+from statistics import NormalDist
+from math import sqrt
+import numpy as np
+from csrgraph import node_entropy
+
+
+class MonteCarloEstimator:
+    def __init__(self, G, formulation_type="Tutzauer", seed=None):
+        '''Initialize the estimator for Graph G. Input variables:
+        - G: Graph,
+        - formulation_type: "Tutzauer" by default. Any other value follows
+        the arrival formulation proposed in the article,
+        - seed: seed (or numpy Generator) for the random number generator.'''
+        csr = G.csr
+        N = len(csr)
+        self.csr = csr
+        self.nodes = G.nodes
+        self.tutzauer = formulation_type == "Tutzauer"
+        self.rng = np.random.default_rng(seed)
+
+        # Transfer tables: move weights without self-loops, self-loop weights
+        # and downstream strength by node id.
+        self.move_weights = np.zeros((N, N))
+        indptr, indices, weights = csr.indptr, csr.indices, csr.weights
+        for u in range(N):
+            for k in range(indptr[u], indptr[u + 1]):
+                if indices[k] != u:
+                    self.move_weights[u, indices[k]] = weights[k]
+        self.self_loops = np.array(G._self_loops(), dtype=float)
+        self.out_strength = np.array(csr.out_strength, dtype=float)
+
+
+    def _simulate(self, i, walkers):
+        '''Simulate walkers from node id i. Returns an array Y of shape
+        (walkers, N): for "Tutzauer", Y[w,j] is the importance weight of
+        walker w if it stopped at j; for the arrival formulation, Y[w,j] is
+        the importance weight of walker w when it arrived at j.'''
+        N = len(self.csr)
+        rows = np.arange(walkers)
+        current = np.full(walkers, i)
+        visited = np.zeros((walkers, N), dtype=bool)
+        visited[:, i] = True
+        weight = np.ones(walkers)
+        Y = np.zeros((walkers, N))
+        if not self.tutzauer:
+            Y[:, i] = 1.0
+
+        active = rows
+        while active.size:
+            t = current[active]
+            A = self.move_weights[t]
+            seen = visited[active]
+            D = self.out_strength[t] - (A * seen).sum(axis=1)
+            available = np.where(seen, 0.0, A)
+            loop = self.self_loops[t]
+            total = loop + available.sum(axis=1)
+
+            # Dead ends (D == 0) stop with probability 1.
+            dead = (D == 0) | (total == 0)
+            Z = np.ones(active.size)
+            Z[~dead] = total[~dead] / D[~dead]
+            w = weight[active] * Z
+            r = self.rng.random(active.size) * total
+            stop = dead | (r < loop)
+
+            stopped = active[stop]
+            if self.tutzauer:
+                Y[stopped, current[stopped]] = w[stop]
+
+            move = ~stop
+            movers = active[move]
+            if movers.size == 0:
+                break
+            cumulative = np.cumsum(available[move], axis=1)
+            x = (r[move] - loop[move])[:, None]
+            u = (cumulative <= x).sum(axis=1)
+            # Guard against rounding at the end of the cumulative sum.
+            last = N - 1 - np.argmax(available[move][:, ::-1] > 0, axis=1)
+            u = np.minimum(u, last)
+
+            current[movers] = u
+            visited[movers, u] = True
+            weight[movers] = w[move]
+            if not self.tutzauer:
+                Y[movers, u] = w[move]
+            active = movers
+        return Y
+
+
+    def estimate_from_i(self, i, tolerance=1e-3, confidence=0.95,
+                        batch_size=10000, max_walkers=10**7):
+        '''Estimate p_ij for all j in G and the entropy of node i.
+        Walkers are simulated in batches until the half-width of every
+        confidence interval of p_ij is below tolerance or max_walkers have
+        been simulated.
+        Input variables:
+        - i: node in graph,
+        - tolerance: target half-width of the confidence intervals,
+        - confidence: confidence level of the intervals,
+        - batch_size: number of walkers simulated at once,
+        - max_walkers: maximum number of walkers.
+        Output variables: dictionary with
+        - 'p_ij': dictionary of estimates with the keys of
+        Graph._probability_paths_from_i,
+        - 'p_ij_ci': dictionary of confidence intervals (low, high),
+        - 'entropy': estimate of the entropy of node i,
+        - 'entropy_ci': confidence interval (low, high) of the entropy,
+        - 'walkers': number of walkers simulated.'''
+        csr = self.csr
+        N = len(csr)
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        first = np.zeros(N)
+        largest = np.zeros(N)
+        second = np.zeros(N) if self.tutzauer else np.zeros((N, N))
+
+        n = 0
+        while n < max_walkers:
+            walkers = min(batch_size, max_walkers - n)
+            Y = self._simulate(csr.index[i], walkers)
+            first += Y.sum(axis=0)
+            largest = np.maximum(largest, Y.max(axis=0))
+            if self.tutzauer:
+                second += (Y * Y).sum(axis=0)
+            else:
+                second += Y.T @ Y
+            n += walkers
+
+            p = first / n
+            variance = (second if self.tutzauer else np.diag(second)) / n - p * p
+            half_width = z * np.sqrt(np.maximum(variance, 0) / n)
+            # Entries never observed: exact (Clopper-Pearson) upper bound
+            # for zero successes, scaled by the largest importance weight.
+            unseen = first == 0
+            half_width[unseen] = (1 - ((1 - confidence) / 2) ** (1 / n)) * np.maximum(largest[unseen], 1)
+            if half_width.max() <= tolerance:
+                break
+
+        # Entropy by the delta method: H(q) with q = p / sum(p).
+        H = node_entropy(list(p))
+        s = p.sum()
+        gradient = np.zeros(N)
+        if s > 0:
+            positive = p > 0
+            gradient[positive] = (-np.log2(p[positive] / s) - H) / s
+        if self.tutzauer:
+            moment = (gradient * gradient * second).sum() / n
+        else:
+            moment = gradient @ second @ gradient / n
+        entropy_variance = max(moment - (gradient @ p) ** 2, 0)
+        entropy_half_width = z * sqrt(entropy_variance / n)
+
+        labels = csr.labels
+        p_ij = {(i,j):0 for j in self.nodes}
+        p_ij_ci = {(i,j):(0, 0) for j in self.nodes}
+        for j in range(N):
+            p_ij[(i,labels[j])] = float(p[j])
+            p_ij_ci[(i,labels[j])] = (max(float(p[j] - half_width[j]), 0),
+                                      float(p[j] + half_width[j]))
+        return {'p_ij': p_ij, 'p_ij_ci': p_ij_ci, 'entropy': H,
+                'entropy_ci': (max(float(H - entropy_half_width), 0),
+                               float(H + entropy_half_width)),
+                'walkers': n}
+
+
+    def calculate_node_entropy(self, i, tolerance=1e-3):
+        '''Estimate the entropy of node i. The function returns a tuple
+        (i, C_H) as Graph.calculate_node_entropy does.'''
+        return (i, self.estimate_from_i(i, tolerance)['entropy'])
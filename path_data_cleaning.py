@@ -3,8 +3,20 @@
 # Data used in this file: pre-processed ("data/manufacturing_paths.txt" and "data/manufacturing_edges.txt")
 # Yamila Mariel Omar
 # Date of original code: 21st July 2020
-
+# Date of code last modification: 18th October 2026
+
+# Usage:
+#     python path_data_cleaning.py
+#         clean with a threshold of 0.1% of the manufactured items and save
+#         the clean paths and edges
+#     python path_data_cleaning.py --sweep 0.0005 0.001 0.002 [--entropy]
+#         report the retained items and clean edges for every threshold
+#         (fractions of the manufactured items) without saving anything,
+#         and the mean node entropy of every distinct clean graph
+
+import sys
 from graphfile import GraphFile
+from pathcleaning import clean_manufacturing_paths, sweep_thresholds, weighted_graph_entropy
 
 
 # Load manufacturing paths paths
@@ -16,28 +28,29 @@ number_of_manufactured_items = sum(paths.values())
 # ==========
 edges = GraphFile("data/manufacturing_edges.txt").read_edges_from_file()
 
-# Filter out edges that only serve a handfull of items
-# ====================================================
+if "--sweep" in sys.argv[1:]:
+    # Threshold sweep
+    # ===============
+    fractions = [float(x) for x in sys.argv[1:] if not x.startswith("--")]
+    thresholds = [f * number_of_manufactured_items for f in fractions]
+    entropy = weighted_graph_entropy if "--entropy" in sys.argv[1:] else None
+    results = sweep_thresholds(paths, edges, thresholds, entropy)
+    header = "fraction threshold retained_items retained_fraction edges graph"
+    print(header + " mean_entropy" if entropy is not None else header)
+    for f, r in zip(fractions, results):
+        line = "{} {} {} {:.6f} {} {}".format(f, r['threshold'], r['retained_items'],
+                                              r['retained_fraction'], r['number_of_edges'],
+                                              r['graph'])
+        if entropy is not None:
+            line = line + " {:.6f}".format(sum(r['entropy'].values()) / len(r['entropy']))
+        print(line)
+    sys.exit(0)
+
+# Filter out edges that only serve a handfull of items, clean manufacturing
+# paths and get clean edges
+# ==========================================================================
 threshold = 0.001 * number_of_manufactured_items
-edges_to_remove = [k for k,v in edges.items() if v < threshold]
-edges_to_remove = set(edges_to_remove)
-
-# Clean manufacturing paths
-# =========================
-clean_paths = {}
-for k,v in paths.items():
-    e = [(i,j) for (i,j) in zip(k, k[1:])]
-    e = set(e)
-    if len(edges_to_remove.intersection(e)) == 0:
-        clean_paths[k] = clean_paths.get(k, 0) + v
-
-# Get clean edges
-# ===============
-clean_edges = {}
-for k,v in clean_paths.items():
-    e = [(i,j) for (i,j) in zip(k, k[1:])]
-    for edge in e:
-        clean_edges[edge] = clean_edges.get(edge, 0) + v
+clean_paths, clean_edges = clean_manufacturing_paths(paths, edges, threshold)
 
 # Save clean paths and edges
 # ==========================
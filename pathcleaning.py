@@ -0,0 +1,257 @@
+# Vectorized cleaning of manufacturing paths
+# Date: 18/10/2026
+# ======================
+#
+# Every pair of consecutive stations in the paths gets an integer edge id
+# (in order of first appearance), so that the paths become a sparse
+# path x edge incidence structure: a flat array of edge ids with the path
+# of every entry. Paths that contain a removed edge are then found with
+# array operations and the weights of the clean edges are a single
+# weighted bincount. The results (and their order) are the same as those
+# of the loops in path_data_cleaning.py.
+#
+# A path is removed at threshold t if and only if its lightest edge weighs
+# less than t, so removal is monotone in t. PathCleaner.sweep buckets the
+# paths by their lightest edge among the sorted thresholds and obtains the
+# clean graphs of all the thresholds at once with reverse cumulative sums.
+import numpy as np
+from graph import Graph
+from condensation import CondensationEngine
+
+
+class PathCleaner:
+    def __init__(self, stations, offsets, counts):
+        '''Encode paths given as flat arrays (the arrays of a PathStore):
+        - stations: the stations of all the paths one after another,
+        - offsets: path k is stations[offsets[k]:offsets[k+1]],
+        - counts: count of every path.'''
+        stations = np.asarray(stations, dtype=np.int64)
+        offsets = np.asarray(offsets, dtype=np.int64)
+        self.stations = stations
+        self.offsets = offsets
+        self.counts = np.asarray(counts, dtype=np.int64)
+        N = len(self.counts)
+
+        # Pairs of consecutive stations that belong to the same path.
+        lengths = np.diff(offsets)
+        pairs = np.maximum(lengths - 1, 0)
+        self.path_of_entry = np.repeat(np.arange(N), pairs)
+        first = np.repeat(offsets[:-1], pairs)
+        within = np.arange(len(first)) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+        source = stations[first + within]
+        target = stations[first + within + 1]
+
+        # Edge ids in order of first appearance.
+        if len(source):
+            radix = int(stations.max()) + 1
+            keys = source * radix + target
+            unique, first_entry, inverse = np.unique(keys, return_index=True,
+                                                     return_inverse=True)
+            order = np.argsort(first_entry, kind='stable')
+            edge_id = np.empty(len(unique), dtype=np.int64)
+            edge_id[order] = np.arange(len(unique))
+            self.entry_edge = edge_id[inverse.reshape(-1)]
+            unique = unique[order]
+            self.edges = list(zip((unique // radix).tolist(), (unique % radix).tolist()))
+        else:
+            self.entry_edge = np.zeros(0, dtype=np.int64)
+            self.edges = []
+
+
+    @classmethod
+    def from_paths(cls, paths):
+        '''Encode a dictionary of paths (tuples of integer stations) and
+        counts, as returned by GraphFile.read_paths_with_count.'''
+        offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in paths])
+        stations = np.fromiter((n for p in paths for n in p), dtype=np.int64,
+                               count=int(offsets[-1]))
+        counts = np.fromiter(paths.values(), dtype=np.int64, count=len(paths))
+        return cls(stations, offsets, counts)
+
+
+    @classmethod
+    def from_store(cls, store):
+        '''Encode the paths of a PathStore. The arrays are copied, so the
+        store can be closed afterwards.'''
+        return cls(np.array(store.stations, dtype=np.int64), np.array(store.offsets),
+                   np.array(store.counts))
+
+
+    def paths_without(self, edges_to_remove):
+        '''Boolean array telling which paths contain none of the edges in
+        edges_to_remove (a set of edge tuples).'''
+        removed = np.array([e in edges_to_remove for e in self.edges], dtype=bool)
+        hits = np.bincount(self.path_of_entry, weights=removed[self.entry_edge],
+                           minlength=len(self.counts))
+        return hits == 0
+
+
+    def edge_weights(self, keep=None):
+        '''Weight of every edge id: the number of items whose path uses it,
+        counting only the paths selected by the boolean array keep (all by
+        default).'''
+        weights = self.counts[self.path_of_entry]
+        entries = self.entry_edge
+        if keep is not None:
+            selected = keep[self.path_of_entry]
+            weights, entries = weights[selected], entries[selected]
+        # Counts add up exactly in float64 below 2**53 items.
+        return np.rint(np.bincount(entries, weights=weights,
+                                   minlength=len(self.edges))).astype(np.int64)
+
+
+    def path(self, k):
+        '''Path k as a tuple of stations.'''
+        return tuple(self.stations[self.offsets[k]:self.offsets[k + 1]].tolist())
+
+
+    def clean_paths(self, keep):
+        '''Dictionary of the paths selected by keep and their counts.'''
+        stations, offsets = self.stations.tolist(), self.offsets.tolist()
+        counts = self.counts.tolist()
+        clean = dict()
+        for k in np.flatnonzero(keep).tolist():
+            path = tuple(stations[offsets[k]:offsets[k + 1]])
+            clean[path] = clean.get(path, 0) + counts[k]
+        return clean
+
+
+    def clean_edges(self, keep):
+        '''Dictionary of the edges of the paths selected by keep and their
+        weights, in order of first appearance in those paths.'''
+        weights = self.edge_weights(keep).tolist()
+        selected = keep[self.path_of_entry]
+        used, first = np.unique(self.entry_edge[selected], return_index=True)
+        used = used[np.argsort(first, kind='stable')].tolist()
+        return {self.edges[e]:weights[e] for e in used}
+
+
+    def lightest_edge(self, edges):
+        '''Weight (in the dictionary edges) of the lightest edge of every
+        path; inf for the paths without edges. Edges missing from edges are
+        never removed and count as inf.'''
+        weights = np.array([edges.get(e, np.inf) for e in self.edges], dtype=float)
+        lightest = np.full(len(self.counts), np.inf)
+        pairs = np.bincount(self.path_of_entry, minlength=len(self.counts))
+        paths = np.flatnonzero(pairs)
+        if len(paths):
+            starts = (np.cumsum(pairs) - pairs)[paths]
+            lightest[paths] = np.minimum.reduceat(weights[self.entry_edge], starts)
+        return lightest
+
+
+    def sweep(self, edges, thresholds, entropy=None):
+        '''Clean the paths for every threshold in one pass.
+        Input variables:
+        - edges: dictionary of edges and weights whose weights are compared
+        with the thresholds (GraphFile.read_edges_from_file),
+        - thresholds: list of minimum edge weights,
+        - entropy: optional function called once for every distinct clean
+        graph with its edges (clean edges plus self-loops on end nodes, as
+        in weighted_pij.py), e.g. weighted_graph_entropy.
+        Output variables: list with a dictionary per threshold (in the
+        order given) with keys:
+        - 'threshold',
+        - 'retained_items' and 'retained_fraction': items (and fraction of
+        items) whose path is kept,
+        - 'retained_paths': number of distinct paths kept,
+        - 'number_of_edges': number of clean edges,
+        - 'edges': dictionary of clean edges and weights (in order of edge
+        id),
+        - 'end_counts': dictionary end station -> items, the weights of
+        the self-loops on end nodes,
+        - 'graph': index of the distinct clean graph (equal for thresholds
+        that keep the same paths),
+        - 'entropy': result of entropy for the graph (if given).'''
+        thresholds = np.asarray(thresholds, dtype=float)
+        K = len(thresholds)
+        order = np.argsort(thresholds, kind='stable')
+        ranked = thresholds[order]
+
+        # Path p is kept for the sorted thresholds 0..bucket[p]-1.
+        bucket = np.searchsorted(ranked, self.lightest_edge(edges), side='right')
+
+        def kept_for_each_threshold(index, buckets, weights, size):
+            # Sum the weights by (index, bucket), then a reverse cumulative
+            # sum over the buckets: column k adds the weights whose bucket
+            # is above k.
+            table = np.bincount(index * (K + 1) + buckets, weights=weights,
+                                minlength=size * (K + 1)).reshape(size, K + 1)
+            kept = np.cumsum(table[:, ::-1], axis=1)[:, ::-1][:, 1:]
+            return np.rint(kept).astype(np.int64)
+
+        edge_weights = kept_for_each_threshold(self.entry_edge, bucket[self.path_of_entry],
+                                               self.counts[self.path_of_entry], len(self.edges))
+        nonempty = np.flatnonzero(np.diff(self.offsets) > 0)
+        end_station = self.stations[self.offsets[nonempty + 1] - 1]
+        stations, end_index = np.unique(end_station, return_inverse=True)
+        end_counts = kept_for_each_threshold(end_index.reshape(-1), bucket[nonempty],
+                                             self.counts[nonempty], len(stations))
+        paths_in_bucket = np.bincount(bucket, minlength=K + 1)
+        distinct = np.cumsum(paths_in_bucket[::-1])[::-1]
+        items = np.cumsum(np.bincount(bucket, weights=self.counts, minlength=K + 1)[::-1])[::-1]
+
+        # Sorted thresholds k and k+1 keep the same paths unless some path
+        # has bucket k+1.
+        graph = np.concatenate(([0], np.cumsum(paths_in_bucket[1:K] > 0)))
+
+        total = int(self.counts.sum())
+        results = [None] * K
+        entropies = dict()
+        for k in range(K):
+            clean_edges = {self.edges[e]:w for e, w in
+                           zip(np.flatnonzero(edge_weights[:, k]).tolist(),
+                               edge_weights[edge_weights[:, k] > 0, k].tolist())}
+            ends = {n:w for n, w in zip(stations.tolist(), end_counts[:, k].tolist()) if w > 0}
+            result = {'threshold': float(ranked[k]),
+                      'retained_items': int(round(items[k + 1])),
+                      'retained_fraction': items[k + 1] / total if total else 0,
+                      'retained_paths': int(distinct[k + 1]),
+                      'number_of_edges': len(clean_edges),
+                      'edges': clean_edges,
+                      'end_counts': ends,
+                      'graph': int(graph[k])}
+            if entropy is not None:
+                if graph[k] not in entropies:
+                    graph_edges = dict(clean_edges)
+                    for n, w in ends.items():
+                        graph_edges[(n,n)] = graph_edges.get((n,n), 0) + w
+                    entropies[graph[k]] = entropy(graph_edges)
+                result['entropy'] = entropies[graph[k]]
+            results[order[k]] = result
+        return results
+
+
+
+def weighted_graph_entropy(edges, formulation_type="Tutzauer"):
+    '''Entropy of every node of the weighted graph with the given edges,
+    calculated exactly with CondensationEngine. Returns a dictionary node ->
+    entropy.'''
+    engine = CondensationEngine(Graph(edges), formulation_type)
+    return dict(engine.calculate_node_entropy(i) for i in engine.nodes)
+
+
+
+def sweep_thresholds(paths, edges, thresholds, entropy=None):
+    '''Clean the paths for every threshold in thresholds in one pass (see
+    PathCleaner.sweep).'''
+    return PathCleaner.from_paths(paths).sweep(edges, thresholds, entropy)
+
+
+
+def clean_manufacturing_paths(paths, edges, threshold):
+    '''Remove the paths that contain an edge whose weight (in edges) is below
+    threshold and recalculate the edges from the clean paths, as in
+    path_data_cleaning.py.
+    Input variables:
+    - paths: dictionary of paths and counts (GraphFile.read_paths_with_count),
+    - edges: dictionary of edges and weights (GraphFile.read_edges_from_file),
+    - threshold: minimum edge weight.
+    Output variables:
+    - dictionary of clean paths and counts,
+    - dictionary of clean edges and weights.'''
+    edges_to_remove = {k for k,v in edges.items() if v < threshold}
+    cleaner = PathCleaner.from_paths(paths)
+    keep = cleaner.paths_without(edges_to_remove)
+    return cleaner.clean_paths(keep), cleaner.clean_edges(keep)
@@ -0,0 +1,170 @@
+# Compact memory-mapped store of manufacturing paths with counts
+# Date: 18/10/2026
+# ======================
+#
+# Binary alternative to the text format of GraphFile.write_paths_with_count.
+# The file holds a header followed by three arrays:
+# - offsets: int64, number of paths + 1, path k is
+#   stations[offsets[k]:offsets[k+1]],
+# - counts: int64, one count per path,
+# - stations: the stations of all the paths one after another, stored in
+#   the smallest unsigned integer type that holds them (uint8 for the 52
+#   workstations of the plant).
+# The header is: magic b'PATHSTOR', format version (uint32), dtype of the
+# stations as a NumPy string (8 bytes), number of paths and number of
+# stations (uint64). The arrays are memory-mapped, so opening a store does
+# not read them and paths are only turned into tuples when accessed.
+from collections.abc import Sequence
+import struct
+import sys
+import numpy as np
+from graphfile import GraphFile
+
+
+MAGIC = b'PATHSTOR'
+VERSION = 1
+_HEADER = struct.Struct('<8sI8sQQ')
+_ALIGNMENT = 8
+
+
+def _padding(size):
+    return -size % _ALIGNMENT
+
+
+
+def _station_dtype(stations):
+    '''Smallest NumPy unsigned type for the stations (a signed 64-bit type if
+    there are negative stations).'''
+    if len(stations) == 0:
+        return np.dtype('<u1')
+    low, high = min(stations), max(stations)
+    if low < 0:
+        return np.dtype('<i8')
+    for dtype in ('<u1', '<u2', '<u4', '<u8'):
+        if high <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise ValueError("Stations do not fit in 64 bits.")
+
+
+
+def write_store(paths, filename):
+    '''Write a dictionary of paths (tuples of integer stations) and counts,
+    as returned by GraphFile.read_paths_with_count, to a path store.'''
+    offsets = np.zeros(len(paths) + 1, dtype='<i8')
+    offsets[1:] = np.cumsum([len(p) for p in paths], dtype='<i8')
+    counts = np.fromiter(paths.values(), dtype='<i8', count=len(paths))
+    flat = [n for p in paths for n in p]
+    stations = np.array(flat, dtype=_station_dtype(flat))
+
+    header = _HEADER.pack(MAGIC, VERSION, stations.dtype.str.encode(),
+                          len(paths), len(stations))
+    with open(filename, 'wb') as f:
+        f.write(header + bytes(_padding(len(header))))
+        for a in (offsets, counts, stations):
+            f.write(a.tobytes())
+            f.write(bytes(_padding(a.nbytes)))
+    return True
+
+
+
+def text_to_store(text_filename, store_filename):
+    '''Convert a text file of paths with counts to a path store.'''
+    return write_store(GraphFile(text_filename).read_paths_with_count(), store_filename)
+
+
+
+def store_to_text(store_filename, text_filename):
+    '''Convert a path store to a text file of paths with counts (the format
+    of GraphFile.write_paths_with_count).'''
+    with PathStore(store_filename) as store:
+        return GraphFile(text_filename).write_paths_with_count(store)
+
+
+
+class PathStore(Sequence):
+    '''Read-only, memory-mapped sequence of paths. store[k] is the k-th path
+    as a tuple of stations and store.counts[k] its count. Paths are in the
+    order of the dictionary the store was written from.'''
+
+    def __init__(self, filename):
+        '''Open (memory-map) the path store in filename.'''
+        self.filename = filename
+        self._map = np.memmap(filename, dtype=np.uint8, mode='r')
+        if len(self._map) < _HEADER.size:
+            raise ValueError("{} is not a path store.".format(filename))
+        magic, version, dtype, N, L = _HEADER.unpack(bytes(self._map[:_HEADER.size]))
+        if magic != MAGIC:
+            raise ValueError("{} is not a path store.".format(filename))
+        if version != VERSION:
+            raise ValueError("{} has path store version {}, expected {}.".format(
+                filename, version, VERSION))
+
+        position = _HEADER.size + _padding(_HEADER.size)
+        arrays = []
+        for dtype, length in (('<i8', N + 1), ('<i8', N), (dtype.rstrip(b'\0').decode(), L)):
+            a = np.frombuffer(self._map, dtype=dtype, count=length, offset=position)
+            arrays.append(a)
+            position += a.nbytes + _padding(a.nbytes)
+        self.offsets, self.counts, self.stations = arrays
+
+
+    def __len__(self):
+        '''Number of paths.'''
+        return len(self.counts)
+
+
+    def __getitem__(self, k):
+        '''Path k as a tuple of stations (a list of paths for a slice).'''
+        if isinstance(k, slice):
+            return [self[j] for j in range(*k.indices(len(self)))]
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError("path index out of range")
+        return tuple(self.stations[self.offsets[k]:self.offsets[k + 1]].tolist())
+
+
+    def lengths(self):
+        '''Array with the number of stations of every path.'''
+        return np.diff(self.offsets)
+
+
+    def items(self):
+        '''Yield (path, count) pairs as the items of the dictionary returned
+        by GraphFile.read_paths_with_count.'''
+        stations = self.stations.tolist()
+        offsets = self.offsets.tolist()
+        for k, count in enumerate(self.counts.tolist()):
+            yield tuple(stations[offsets[k]:offsets[k + 1]]), count
+
+
+    def to_dict(self):
+        '''Dictionary of paths and counts, as GraphFile.read_paths_with_count.'''
+        return dict(self.items())
+
+
+    def close(self):
+        '''Release the memory map. Arrays taken from the store (e.g. counts
+        or stations) keep it open, and valid, until they are released too.'''
+        self.offsets = self.counts = self.stations = None
+        self._map = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+if __name__ == "__main__":
+    # Convert between formats according to the extension of the input file:
+    #     python pathstore.py data/clean_manufacturing_paths.txt data/clean_manufacturing_paths.bin
+    #     python pathstore.py data/clean_manufacturing_paths.bin data/clean_manufacturing_paths.txt
+    source, target = sys.argv[1], sys.argv[2]
+    if source.endswith('.txt'):
+        text_to_store(source, target)
+    else:
+        store_to_text(source, target)
@@ -0,0 +1,189 @@
+# Prefix trie of manufacturing paths with aggregated counts
+# Date: 18/10/2026
+# ======================
+#
+# Paths that share a prefix (the same entry stations and line) share the
+# nodes of the trie. Every trie node stores its station, its parent, the
+# number of items whose path ends at the node and the number of items whose
+# path goes through it (the sum over its subtree), so that prefix queries
+# only walk the prefix and node, start, end and edge frequencies are sums
+# over the trie nodes instead of over every path. Nodes are kept in flat
+# arrays indexed by node id; node 0 is the root (the empty prefix).
+from array import array
+
+
+class PathTrie:
+    def __init__(self, paths=None):
+        '''Initialize the trie, optionally with a dictionary of paths (tuples
+        of integer stations) and counts, as returned by
+        GraphFile.read_paths_with_count, or any iterable of (path, count)
+        pairs such as PathStore.items().'''
+        self.station = array('q', [-1])
+        self.parent = array('q', [-1])
+        self.depth = array('q', [0])
+        self.end = array('q', [0])
+        self.total = array('q', [0])
+        self.first_child = array('q', [-1])
+        self.last_child = array('q', [-1])
+        self.next_sibling = array('q', [-1])
+        self.children = dict()
+        self.number_of_paths = 0
+        if paths is not None:
+            if hasattr(paths, 'items'):
+                paths = paths.items()
+            for path, count in paths:
+                self.add(path, count)
+
+
+    def _child(self, node, station):
+        '''Return the child of node for station, creating it if needed.'''
+        key = (node, station)
+        child = self.children.get(key)
+        if child is None:
+            child = len(self.station)
+            self.children[key] = child
+            self.station.append(station)
+            self.parent.append(node)
+            self.depth.append(self.depth[node] + 1)
+            self.end.append(0)
+            self.total.append(0)
+            self.first_child.append(-1)
+            self.last_child.append(-1)
+            self.next_sibling.append(-1)
+            if self.last_child[node] == -1:
+                self.first_child[node] = child
+            else:
+                self.next_sibling[self.last_child[node]] = child
+            self.last_child[node] = child
+        return child
+
+
+    def add(self, path, count=1):
+        '''Add count items that followed path.'''
+        node = 0
+        self.total[0] += count
+        for station in path:
+            node = self._child(node, station)
+            self.total[node] += count
+        if self.end[node] == 0 and count != 0:
+            self.number_of_paths += 1
+        self.end[node] += count
+
+
+    def find(self, prefix):
+        '''Return the trie node of prefix, or None if no path starts with it.'''
+        node = 0
+        for station in prefix:
+            node = self.children.get((node, station))
+            if node is None:
+                return None
+        return node
+
+
+    def path(self, node):
+        '''Return the path (tuple of stations) of a trie node.'''
+        path = []
+        while node > 0:
+            path.append(self.station[node])
+            node = self.parent[node]
+        return tuple(reversed(path))
+
+
+    def count(self, path):
+        '''Number of items that followed exactly path.'''
+        node = self.find(path)
+        return 0 if node is None else self.end[node]
+
+
+    def prefix_count(self, prefix):
+        '''Number of items whose path starts with prefix (e.g. (0, 1, 2) for
+        the items that went 0 -> 1 -> 2).'''
+        node = self.find(prefix)
+        return 0 if node is None else self.total[node]
+
+
+    def subtree_sum(self, node):
+        '''Number of items whose path goes through the trie node.'''
+        return self.total[node]
+
+
+    @property
+    def number_of_items(self):
+        '''Total number of items.'''
+        return self.total[0]
+
+
+    def __len__(self):
+        '''Number of distinct paths.'''
+        return self.number_of_paths
+
+
+    def items(self, prefix=()):
+        '''Yield (path, count) for every distinct path that starts with
+        prefix (all paths by default) in depth-first order, so that paths
+        with the same prefix come together.'''
+        start = self.find(prefix)
+        if start is None:
+            return
+        path = list(prefix)
+        if self.end[start] != 0:
+            yield tuple(path), self.end[start]
+        stack = []
+        if self.first_child[start] != -1:
+            stack.append(self.first_child[start])
+        while stack:
+            node = stack.pop()
+            if self.next_sibling[node] != -1:
+                stack.append(self.next_sibling[node])
+            del path[self.depth[node] - 1:]
+            path.append(self.station[node])
+            if self.end[node] != 0:
+                yield tuple(path), self.end[node]
+            if self.first_child[node] != -1:
+                stack.append(self.first_child[node])
+
+
+    def node_counts(self):
+        '''Dictionary station -> number of times the station shows in the
+        paths of all items.'''
+        counts = dict()
+        for node in range(1, len(self.station)):
+            n = self.station[node]
+            counts[n] = counts.get(n, 0) + self.total[node]
+        return counts
+
+
+    def start_counts(self):
+        '''Dictionary station -> number of items whose path starts at it.'''
+        counts = dict()
+        node = self.first_child[0]
+        while node != -1:
+            counts[self.station[node]] = self.total[node]
+            node = self.next_sibling[node]
+        return counts
+
+
+    def end_counts(self):
+        '''Dictionary station -> number of items whose path ends at it.'''
+        counts = dict()
+        for node in range(1, len(self.station)):
+            if self.end[node] != 0:
+                n = self.station[node]
+                counts[n] = counts.get(n, 0) + self.end[node]
+        return counts
+
+
+    def edge_counts(self):
+        '''Dictionary with edges (i,j) as keys and the number of items that
+        went from i to j as values, the clean edges of path_data_cleaning.py.
+        Every trie edge between two stations adds the items of its subtree.
+        Since node ids grow as the paths are added, the edges are in the same
+        order as when they are counted path by path.'''
+        edges = dict()
+        station, parent, total = self.station, self.parent, self.total
+        for node in range(1, len(station)):
+            p = parent[node]
+            if p > 0:
+                e = (station[p], station[node])
+                edges[e] = edges.get(e, 0) + total[node]
+        return edges
@@ -0,0 +1,460 @@
+# Binary store of p_ij results, dense (memory-mapped) or sparse
+# Date: 18/10/2026
+# ======================
+#
+# Binary alternative to the text files of GraphFile.write_graph_to_file.
+# The file holds a header, JSON metadata and the arrays of the matrix:
+# - dense layout: an N x N float64 matrix that pool workers memory-map and
+#   fill row by row (probability_paths_to_file), followed by an N x N uint8
+#   mask that is 1 for the float entries (reached nodes, 0.0 included) and
+#   0 for the integer ones (the 0 of unreached nodes and the 1 of a source
+#   that stops at once), so rows keep the types of Graph p_ij rows,
+# - sparse layout: the stored entries in CSR form, indptr (int64, N + 1),
+#   indices (int64) and values (float64).
+# Rows and columns are the node labels sorted as in CSRGraph, so row a of
+# the matrix is the row of CSR node id a. The header is: magic b'PIJSTORE',
+# format version (uint32), layout (uint32), N, number of stored entries and
+# size of the metadata (uint64).
+#
+# The metadata holds the labels, the run parameters and the layout of the
+# text file: the order of its rows and columns (or of every line, if the
+# file is not a full rows x columns block) and the few values whose text is
+# not str(float(p)). Entries missing from a sparse store are written as 0,
+# like the unreached nodes of the p_ij dictionaries, so text files convert
+# to a sparse store and back without changes, and the stores are
+# proportional to the number of stored entries.
+import json
+import multiprocessing
+import struct
+import sys
+import numpy as np
+from csrgraph import node_sort_key
+from graphfile import GraphFile
+from sharedgraph import SharedGraph
+
+
+MAGIC = b'PIJSTORE'
+VERSION = 1
+DENSE, SPARSE = 0, 1
+_HEADER = struct.Struct('<8sIIQQQ')
+_ALIGNMENT = 8
+
+
+def _padding(size):
+    return -size % _ALIGNMENT
+
+
+
+def is_pij_store(filename):
+    '''Whether filename is a p_ij store (starts with the magic bytes).'''
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+
+def _write_header(f, layout, N, nnz, metadata):
+    '''Write header and metadata, padded to the alignment of the arrays.'''
+    metadata = json.dumps(metadata).encode()
+    metadata += b' ' * _padding(_HEADER.size + len(metadata))
+    f.write(_HEADER.pack(MAGIC, VERSION, layout, N, nnz, len(metadata)))
+    f.write(metadata)
+    return _HEADER.size + len(metadata)
+
+
+
+def _metadata(labels, parameters, rows, columns=None, order=None, tokens=None):
+    return {'labels': list(labels), 'parameters': parameters or {},
+            'rows': rows, 'columns': columns, 'order': order,
+            'tokens': tokens or []}
+
+
+
+def _text_layout(keys, index):
+    '''Order of the keys (i,j) of a p_ij dictionary as rows and columns
+    (lists of label indexes) if they form a full rows x columns block in
+    row-major order, else as a list of [row, column] pairs.'''
+    columns = []
+    for i, j in keys:
+        if i != keys[0][0]:
+            break
+        columns.append(j)
+    C = len(columns)
+    rows = [keys[k][0] for k in range(0, len(keys), C)] if C else []
+    if (C * len(rows) == len(keys) and len(set(rows)) == len(rows) and
+            all(keys[k] == (rows[k // C], columns[k % C]) for k in range(len(keys)))):
+        return [index[i] for i in rows], [index[j] for j in columns], None
+    return None, None, [[index[i], index[j]] for i, j in keys]
+
+
+
+def write_p_ij(filename, p_ij, parameters=None, labels=None):
+    '''Write a dictionary p_ij with (i,j) keys (as returned by
+    WorkStealingScheduler.probability_paths) to a sparse store. Entries with
+    the integer value 0 are not stored; float entries (0.0 included) are.
+    The store converts back to the text file GraphFile.write_graph_to_file
+    writes for p_ij.
+    Input variables:
+    - filename: store file,
+    - p_ij: dictionary of probabilities,
+    - parameters: optional dictionary of run parameters (JSON),
+    - labels: nodes of the matrix (the nodes in p_ij by default).'''
+    if labels is None:
+        labels = {n for k in p_ij for n in k}
+    labels = sorted(labels, key=node_sort_key)
+    index = {n:a for a, n in enumerate(labels)}
+    rows, columns, order = _text_layout(list(p_ij), index)
+
+    a, b, values, tokens = [], [], [], []
+    for (i, j), p in p_ij.items():
+        if type(p) is int and p == 0:
+            continue
+        a.append(index[i])
+        b.append(index[j])
+        values.append(float(p))
+        if str(p) != str(float(p)):
+            tokens.append([index[i], index[j], str(p)])
+    a, b = np.array(a, dtype='<i8'), np.array(b, dtype='<i8')
+    values = np.array(values, dtype='<f8')
+    by_row = np.lexsort((b, a))
+    return _write_sparse(filename, labels, a[by_row], b[by_row], values[by_row],
+                         _metadata(labels, parameters, rows, columns, order, tokens))
+
+
+
+def _write_sparse(filename, labels, a, b, values, metadata):
+    '''Write the stored entries (row indexes a, column indexes b, values),
+    sorted by row and column, in CSR form.'''
+    N = len(labels)
+    indptr = np.zeros(N + 1, dtype='<i8')
+    indptr[1:] = np.cumsum(np.bincount(a, minlength=N))
+    with open(filename, 'wb') as f:
+        _write_header(f, SPARSE, N, len(values), metadata)
+        for array in (indptr, b.astype('<i8'), values.astype('<f8')):
+            f.write(array.tobytes())
+            f.write(bytes(_padding(array.nbytes)))
+    return True
+
+
+
+def create_dense(filename, labels, rows=None, columns=None, parameters=None):
+    '''Create a dense store filled with zeros and return it open for writing
+    (PijStore with mode 'r+').
+    Input variables:
+    - labels: nodes of the matrix (sorted as in CSRGraph),
+    - rows: nodes whose rows are written to text (all by default),
+    - columns: order of the columns in text (sorted labels by default),
+    - parameters: optional dictionary of run parameters (JSON).'''
+    labels = sorted(labels, key=node_sort_key)
+    index = {n:a for a, n in enumerate(labels)}
+    rows = list(range(len(labels))) if rows is None else [index[i] for i in rows]
+    columns = list(range(len(labels))) if columns is None else [index[j] for j in columns]
+    N = len(labels)
+    metadata = _metadata(labels, parameters, rows, columns)
+    metadata['floats'] = True
+    with open(filename, 'wb') as f:
+        offset = _write_header(f, DENSE, N, N * N, metadata)
+        f.truncate(offset + 8 * N * N + N * N + _padding(N * N))
+    return PijStore(filename, mode='r+')
+
+
+
+def text_to_pij(text_filename, pij_filename, parameters=None):
+    '''Convert a text file of p_ij values to a sparse store. Values written
+    as integers (the zeros of unreached nodes) are read as integers, the
+    others as floats, so that the store converts back to the same file.'''
+    p_ij = dict()
+    with GraphFile(text_filename).open() as f:
+        for line in f:
+            i, j, p = line.split()
+            i, j = _label(i), _label(j)
+            if (i, j) in p_ij:
+                raise ValueError("{} has more than one line for {}.".format(text_filename, (i, j)))
+            value = _value(p)
+            if str(value) != p:
+                raise ValueError("Value {} would not be written back as it is.".format(p))
+            p_ij[(i,j)] = value
+    return write_p_ij(pij_filename, p_ij, parameters)
+
+
+
+def _label(token):
+    '''Node label of a token: an integer when the token is one.'''
+    try:
+        node = int(token)
+    except ValueError:
+        return token
+    if str(node) != token:
+        raise ValueError("Node {} would not be written back as it is.".format(token))
+    return node
+
+
+
+def pij_to_text(pij_filename, text_filename):
+    '''Convert a store to a text file of p_ij values, as written by
+    GraphFile.write_graph_to_file.'''
+    with PijStore(pij_filename) as store:
+        return GraphFile(text_filename).write_graph_to_file(store.to_dict())
+
+
+
+def merge_sparse(filenames, output, parameters=None):
+    '''Merge sparse stores of the same nodes that hold different rows (e.g.
+    runs on different sources) into one sparse store. Rows are written to
+    text in the order of the stores.'''
+    stores = [PijStore(filename) for filename in filenames]
+    try:
+        labels = stores[0].labels
+        rows, a, b, values, tokens = [], [], [], [], []
+        columns = stores[0].metadata['columns']
+        for store in stores:
+            if store.labels != labels or store.layout != SPARSE:
+                raise ValueError("{} cannot be merged with {}.".format(store.filename, filenames[0]))
+            if store.metadata['order'] is not None or store.metadata['columns'] != columns:
+                columns = None
+            rows.extend(store.metadata['rows'] or [])
+            counts = np.diff(store.indptr)
+            a.append(np.repeat(np.arange(len(labels)), counts))
+            b.append(np.asarray(store.indices))
+            values.append(np.asarray(store.values))
+            tokens.extend(store.metadata['tokens'])
+        if len(set(rows)) != len(rows) or columns is None:
+            raise ValueError("The stores hold the same rows or differ in their columns.")
+        a, b, values = np.concatenate(a), np.concatenate(b), np.concatenate(values)
+        order = np.lexsort((b, a))
+        if parameters is None:
+            parameters = stores[0].parameters
+        return _write_sparse(output, labels, a[order], b[order], values[order],
+                             _metadata(labels, parameters, rows, columns, None, tokens))
+    finally:
+        for store in stores:
+            store.close()
+
+
+
+def dense_to_sparse(dense_filename, sparse_filename):
+    '''Convert a dense store to a sparse store of its stored entries (the
+    non-zero entries and the zeros of reached nodes).'''
+    with PijStore(dense_filename) as store:
+        a, b, values = store.nonzeros()
+        metadata = dict(store.metadata)
+        metadata.pop('floats', None)
+        metadata['tokens'] = store.metadata['tokens'] + store._integer_tokens()
+        return _write_sparse(sparse_filename, store.labels, a, b, values, metadata)
+
+
+
+class PijStore:
+    '''Memory-mapped p_ij store. store.matrix is the dense matrix of a dense
+    store (writable with mode 'r+') and store.floats its mask of float
+    entries (None for stores written without it); store.indptr,
+    store.indices and store.values are the CSR arrays of a sparse store.'''
+
+    def __init__(self, filename, mode='r'):
+        '''Open (memory-map) the store in filename.'''
+        self.filename = filename
+        self._map = np.memmap(filename, dtype=np.uint8, mode=mode)
+        if len(self._map) < _HEADER.size:
+            raise ValueError("{} is not a p_ij store.".format(filename))
+        magic, version, layout, N, nnz, size = _HEADER.unpack(bytes(self._map[:_HEADER.size]))
+        if magic != MAGIC:
+            raise ValueError("{} is not a p_ij store.".format(filename))
+        if version != VERSION:
+            raise ValueError("{} has p_ij store version {}, expected {}.".format(
+                filename, version, VERSION))
+        position = _HEADER.size + size
+        self.metadata = json.loads(bytes(self._map[_HEADER.size:position]))
+        self.labels = self.metadata['labels']
+        self.parameters = self.metadata['parameters']
+        self.index = {n:a for a, n in enumerate(self.labels)}
+        self.layout = layout
+        self.N = N
+        self.matrix = self.floats = self.indptr = self.indices = self.values = None
+        if layout == DENSE:
+            self.matrix = np.frombuffer(self._map, dtype='<f8', count=N * N,
+                                        offset=position).reshape(N, N)
+            if self.metadata.get('floats'):
+                self.floats = np.frombuffer(self._map, dtype=np.uint8, count=N * N,
+                                            offset=position + 8 * N * N).reshape(N, N)
+        else:
+            arrays = []
+            for dtype, length in (('<i8', N + 1), ('<i8', nnz), ('<f8', nnz)):
+                a = np.frombuffer(self._map, dtype=dtype, count=length, offset=position)
+                arrays.append(a)
+                position += a.nbytes + _padding(a.nbytes)
+            self.indptr, self.indices, self.values = arrays
+
+
+    def __len__(self):
+        '''Number of nodes.'''
+        return self.N
+
+
+    def write_row(self, a, p_j):
+        '''Write the row of node id a (dense stores open with mode 'r+').
+        Integer entries of p_j (the 0 of unreached nodes) are marked as such
+        in store.floats.'''
+        self.matrix[a] = p_j
+        if self.floats is not None:
+            self.floats[a] = [not isinstance(p, int) for p in p_j]
+
+
+    def row(self, i):
+        '''Row of node i as an array indexed by node id.'''
+        a = self.index[i]
+        if self.layout == DENSE:
+            return self.matrix[a]
+        row = np.zeros(self.N)
+        start, end = self.indptr[a], self.indptr[a + 1]
+        row[self.indices[start:end]] = self.values[start:end]
+        return row
+
+
+    def nonzeros(self):
+        '''Stored entries as arrays of row ids, column ids and values. The
+        stored entries of a dense store are its non-zero entries and, if it
+        has a mask of float entries, the zeros of reached nodes.'''
+        if self.layout == DENSE:
+            if self.floats is None:
+                a, b = np.nonzero(self.matrix)
+            else:
+                a, b = np.nonzero((self.matrix != 0) | (self.floats != 0))
+            return a, b, self.matrix[a, b]
+        a = np.repeat(np.arange(self.N), np.diff(self.indptr))
+        return a, np.asarray(self.indices), np.asarray(self.values)
+
+
+    def to_dense(self):
+        '''Dense matrix (the memory-mapped matrix of a dense store).'''
+        if self.layout == DENSE:
+            return self.matrix
+        P = np.zeros((self.N, self.N))
+        a, b, values = self.nonzeros()
+        P[a, b] = values
+        return P
+
+
+    def to_dict(self):
+        '''Dictionary p_ij with (i,j) keys in the order of the text file:
+        unreached pairs are the integer 0, the other values floats (or
+        integers, if they were written as such).'''
+        labels = self.labels
+        tokens = {(a, b):token for a, b, token in self.metadata['tokens'] + self._integer_tokens()}
+        if self.metadata['order'] is not None:
+            order = self.metadata['order']
+        else:
+            columns = self.metadata['columns']
+            order = ((a, b) for a in self.metadata['rows'] for b in columns)
+        a, b, values = self.nonzeros()
+        stored = dict(zip(zip(a.tolist(), b.tolist()), values.tolist()))
+        p_ij = dict()
+        for a, b in order:
+            p = stored.get((a, b), 0)
+            if (a, b) in tokens:
+                p = _value(tokens[(a, b)])
+            p_ij[(labels[a], labels[b])] = p
+        return p_ij
+
+
+    def _integer_tokens(self):
+        '''Tokens [a, b, text] of the non-zero integer entries of a dense
+        store (e.g. the 1 of a source that stops at once).'''
+        if self.floats is None:
+            return []
+        a, b = np.nonzero((self.matrix != 0) & (self.floats == 0))
+        return [[a, b, str(int(p))] for a, b, p in
+                zip(a.tolist(), b.tolist(), self.matrix[a, b].tolist())]
+
+
+    def close(self):
+        '''Flush (mode 'r+') and release the memory map. Rows and matrices
+        taken from a dense store keep it open, and valid, until they are
+        released too.'''
+        self.matrix = self.floats = self.indptr = self.indices = self.values = None
+        if self._map.mode == 'r+':
+            self._map.flush()
+        self._map = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+def _value(token):
+    '''Value of a token of a text file: an integer when it is one.'''
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+
+# Shared graph and output store of the worker processes, set by
+# _initialize_worker.
+_worker_state = None
+
+
+def _initialize_worker(graph_spec, filename):
+    '''Pool initializer: attach to the shared graph and open the store.'''
+    global _worker_state
+    shm, csr = SharedGraph.attach(graph_spec)
+    _worker_state = (shm, csr, PijStore(filename, mode='r+'))
+
+
+def _row_from_i(a, formulation_type):
+    '''Calculate the row of node id a and write it into the store.'''
+    shm, csr, store = _worker_state
+    store.write_row(a, csr.probability_paths_from(a, formulation_type))
+    return a
+
+
+def probability_paths_to_file(G, filename, formulation_type="Tutzauer", sources=None,
+                              processes=None, parameters=None, self_loops=None):
+    '''Calculate p_ij of Graph G with a pool of workers that share one
+    read-only copy of the graph and write their rows directly into a dense
+    store. Only the source node id is sent with each task and nothing is
+    sent back.
+    Input variables:
+    - G: Graph,
+    - filename: dense store to create,
+    - formulation_type: "Tutzauer" by default,
+    - sources: nodes for which p_ij is calculated (all nodes by default),
+    - processes: number of worker processes (default: all cores),
+    - parameters: optional dictionary of run parameters (JSON),
+    - self_loops: optional dictionary node -> self-loop weight used for the
+    stopping probability instead of the self-loops of G (as in
+    WorkStealingScheduler).
+    Output variables:
+    - PijStore of the results (the text rows and columns follow sources
+    and G.nodes, as the files of binary_pij.py and weighted_pij.py).'''
+    csr = G.csr
+    if sources is None:
+        sources = list(G.nodes)
+    if parameters is None:
+        parameters = {'formulation_type': formulation_type}
+    create_dense(filename, csr.labels, sources, list(G.nodes), parameters).close()
+    if self_loops is None:
+        self_loops = G._self_loops()
+    else:
+        self_loops = [self_loops.get(n, 0) for n in csr.labels]
+    with SharedGraph(csr, self_loops) as graph:
+        with multiprocessing.Pool(processes, _initialize_worker,
+                                  (graph.spec, filename)) as pool:
+            pool.starmap(_row_from_i, [(csr.index[i], formulation_type) for i in sources])
+    return PijStore(filename)
+
+
+
+if __name__ == "__main__":
+    # Convert between formats according to the extension of the input file:
+    #     python pijformat.py results/2020_08_23_weighted_pij_directed_selfloopsonallnodes.txt weighted.pij
+    #     python pijformat.py weighted.pij weighted.txt
+    source, target = sys.argv[1], sys.argv[2]
+    if source.endswith('.pij'):
+        pij_to_text(source, target)
+    else:
+        text_to_pij(source, target)
@@ -1,31 +1,9 @@
 # Plot heatmap and save
 
 from heatmap import *
+from graphfile import GraphFile
 import os
 
-# =============================================================================
-# Function Definitions
-# =============================================================================
-def read_probs_from_file(filename):
-    ''' '''
-    p_ij = dict()
-    nodes = set()
-    with open(filename) as f:
-        for line in f:
-            try:
-                line = line.strip().split(" ")
-                i, j, p = int(line[0]), int(line[1]), float(line[2])
-                p_ij[(i,j)] = p
-                nodes.add(i)
-                nodes.add(j)
-            except:
-                print(line)
-    return p_ij, nodes
-
-
-# =============================================================================
-# END Function Definitions
-# =============================================================================
 
 if __name__ == "__main__":
     # Read data from file
@@ -39,7 +17,7 @@ if __name__ == "__main__":
     filename = input("\n\nSelected File:")
     normalize = input("\nDo you wish to normalize (y/n)? ")
 
-    p_ij, nodes = read_probs_from_file("results/" + filename)
+    p_ij, nodes = GraphFile("results/" + filename).read_probs_from_file()
     nodes = list(nodes)
     nodes.sort()
 
@@ -0,0 +1,177 @@
+# Content-addressed on-disk cache of p_ij rows
+# Date: 18/10/2026
+# ======================
+#
+# The p_ij row of a source node depends only on the graph (nodes, edges and
+# weights), the self-loop weights used for the stopping probability, the
+# formulation type and, for WorkStealingScheduler, max_paths (the split of
+# the enumeration into tasks changes how the row is rounded). These are
+# hashed (sha256) into a key, and the row of every source is stored in its
+# own JSON file named after the hash of the key and the source. Runs on the
+# same graph, or experiments that share some of their graphs, read the rows
+# already calculated instead of enumerating the paths again.
+#
+# Files are written to a temporary file and moved into place with
+# os.replace, so concurrent writers (e.g. several runs on the same cache
+# directory) never leave a partial file: the last writer wins and both
+# wrote the same row. Reading a row updates its modification time, and the
+# least recently used rows are removed when the cache grows beyond
+# max_bytes. Floats are written with repr, so rows are read back exactly.
+from hashlib import sha256
+import json
+import os
+import tempfile
+from csrgraph import node_entropy
+
+
+def graph_hash(csr, self_loops):
+    '''sha256 of a CSR graph and the self-loop weights used for the stopping
+    probability. The CSR arrays are sorted by node, so the hash does not
+    depend on the order of the edges dictionary.'''
+    graph = repr((csr.labels, list(csr.indptr), list(csr.indices),
+                  list(csr.weights), list(csr.out_strength),
+                  list(self_loops)))
+    return sha256(graph.encode()).hexdigest()
+
+
+
+def cache_key(csr, self_loops, formulation_type, max_paths=None):
+    '''Key of the p_ij rows of a graph, its self-loop policy, the
+    formulation type and the max_paths of the tasks the enumeration is split
+    into (None for rows calculated in one piece).'''
+    key = repr((graph_hash(csr, self_loops), formulation_type, max_paths))
+    return sha256(key.encode()).hexdigest()
+
+
+
+class ResultCache:
+    def __init__(self, directory="results/cache", max_bytes=2**30):
+        '''Initialize the cache. Input variables:
+        - directory: cache directory (created if it does not exist),
+        - max_bytes: the least recently used rows are removed when the
+        files in the cache take more than max_bytes.'''
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+
+    def _filename(self, key, source):
+        '''File of the row of source: <directory>/<2 hex digits>/<hash>.json'''
+        name = sha256(repr((key, source)).encode()).hexdigest()
+        return os.path.join(self.directory, name[:2], name + ".json")
+
+
+    def _files(self):
+        '''List of (modification time, size, filename) of the cached rows.'''
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                filename = os.path.join(root, name)
+                try:
+                    stat = os.stat(filename)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, filename))
+        return files
+
+
+    def size(self):
+        '''Number of bytes taken by the cached rows.'''
+        return sum(size for _, size, _ in self._files())
+
+
+    def _read(self, key, source):
+        '''Return the cached record of source or None, counting hits and
+        misses. Reading a row marks it as recently used.'''
+        filename = self._filename(key, source)
+        try:
+            with open(filename) as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            record = None
+        if record is None or record.get('key') != key or record.get('source') != source:
+            self.misses += 1
+            return None
+        try:
+            os.utime(filename)
+        except FileNotFoundError:
+            pass
+        self.hits += 1
+        return record
+
+
+    def get_row(self, key, source):
+        '''Return the cached row of source (a list with p_ij by CSR node id)
+        or None if it is not in the cache.'''
+        record = self._read(key, source)
+        if record is None:
+            return None
+        row = [0] * record['length']
+        for j, p in record['row']:
+            row[j] = p
+        return row
+
+
+    def get_entropy(self, key, source):
+        '''Return the cached entropy of source or None.'''
+        record = self._read(key, source)
+        return None if record is None else record['entropy']
+
+
+    def put_row(self, key, source, row):
+        '''Store the row of source (a list with p_ij by CSR node id). Only
+        the reached nodes are written: the nodes that are not reached are the
+        integer 0, reached nodes keep their value, 0.0 included.'''
+        filename = self._filename(key, source)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        record = {'key': key, 'source': source, 'length': len(row),
+                  'row': [[j, p] for j, p in enumerate(row) if p != 0 or type(p) is not int],
+                  'entropy': node_entropy(row)}
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(filename), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(record, f)
+            os.replace(temporary, filename)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += os.path.getsize(filename)
+        if self._size > self.max_bytes:
+            self.evict()
+        return True
+
+
+    def evict(self, max_bytes=None):
+        '''Remove the least recently used rows until the cache takes at most
+        max_bytes (self.max_bytes by default). Returns the number of rows
+        removed.'''
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        files = sorted(self._files())
+        size = sum(s for _, s, _ in files)
+        removed = 0
+        for _, s, filename in files:
+            if size <= max_bytes:
+                break
+            try:
+                os.remove(filename)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            size -= s
+        self._size = size
+        return removed
+
+
+    def clear(self):
+        '''Remove all the cached rows.'''
+        return self.evict(0)
@@ -0,0 +1,243 @@
+# Work-stealing parallel scheduler for p_ij
+# Date: 18/10/2026
+# ======================
+#
+# A task is a path prefix (a list of node ids starting at the source). The
+# worker that runs it scores every path that extends the prefix, but stops
+# after max_paths paths and hands the unexplored part of its DFS back as
+# new, shorter tasks. These are put at the front of the queue, so idle
+# workers steal the large sub-trees of the heavy source stations instead
+# of waiting for the one worker that got them. Partial p_ij rows are
+# reduced with math.fsum, so the result does not depend on the order in
+# which tasks finish. Workers read the graph from a SharedGraph.
+#
+# Rows keep the types of Graph._probability_paths_from_i: nodes that are
+# not reached are the integer 0, reached nodes are floats (0.0 included),
+# and the source is the integer 1 when the walk stops there at once (a
+# node without downstream edges, or the arrival formulation).
+#
+# Optionally, the row of every source is written into a shared output
+# matrix indexed by (i, j) (a dense PijStore or a SharedMatrix) as soon as
+# the source is finished, and its partial row is then dropped, so the
+# parent only keeps the partial rows of the sources still running.
+from collections import deque
+from math import fsum
+import multiprocessing
+import queue
+from sharedgraph import SharedGraph
+from instrumentation import instrumented_task
+from resultcache import cache_key
+
+
+def reached(p):
+    '''Whether the entry p of a p_ij row is a reached node (unreached nodes
+    are the integer 0).'''
+    return p != 0 or type(p) is not int
+
+
+
+def sum_partials(parts):
+    '''Reduce the partial values of a p_ij entry: math.fsum of floats, or
+    the plain sum if they are all integers, so that the entry keeps the
+    type of the serial calculation.'''
+    if all(type(p) is int for p in parts):
+        return sum(parts)
+    return fsum(parts)
+
+
+# Shared graph of the worker processes, set by _initialize_worker.
+_worker_graph = None
+
+
+def _initialize_worker(graph_spec):
+    '''Pool initializer: attach to the shared graph.'''
+    global _worker_graph
+    _worker_graph = SharedGraph.attach(graph_spec)
+
+
+def _run_task(source, prefix, formulation_type, max_paths, instrumented=False):
+    '''Score the paths that extend prefix in a worker process. Returns a
+    tuple (source, prefix, partial row as {j: p}, unexplored prefixes,
+    statistics). The statistics (see instrumentation.instrumented_task) are
+    only collected if instrumented is True; otherwise they are None.'''
+    shm, csr = _worker_graph
+    p_j = [0] * len(csr)
+    if instrumented:
+        frontier, stats = instrumented_task(csr, prefix, formulation_type, p_j,
+                                            max_paths=max_paths)
+    else:
+        frontier, paths = csr.probability_paths_from_prefix(
+            prefix, formulation_type, p_j, max_paths=max_paths)
+        stats = None
+    partial = {j:p for j,p in enumerate(p_j) if reached(p)}
+    return source, prefix, partial, frontier, stats
+
+
+
+class WorkStealingScheduler:
+    def __init__(self, G, formulation_type="Tutzauer", processes=None,
+                 max_paths=10**5, instrumentation=None, self_loops=None,
+                 cache=None):
+        '''Parallel calculation of p_ij for Graph G.
+        Input variables:
+        - G: Graph,
+        - formulation_type: "Tutzauer" by default. Any other value follows
+        the arrival formulation proposed in the article,
+        - processes: number of worker processes (default: all cores),
+        - max_paths: number of paths a task scores before it splits the rest
+        of its sub-tree into new tasks,
+        - instrumentation: optional Instrumentation that receives the
+        statistics of every task and source,
+        - self_loops: optional dictionary node -> self-loop weight used for
+        the stopping probability instead of the self-loops of G. These
+        self-loops are not part of the downstream degree of the nodes,
+        - cache: optional ResultCache. Sources whose rows are in it are not
+        calculated again and the rows of the other sources are stored in it.'''
+        self.csr = G.csr
+        self.nodes = G.nodes
+        if self_loops is None:
+            self.self_loops = G._self_loops()
+        else:
+            self.self_loops = [self_loops.get(n, 0) for n in self.csr.labels]
+        self.formulation_type = formulation_type
+        self.processes = processes or multiprocessing.cpu_count()
+        self.max_paths = max_paths
+        self.instrumentation = instrumentation
+        self.cache = cache
+        self.key = None
+        if cache is not None:
+            self.key = cache_key(self.csr, self.self_loops, formulation_type, max_paths)
+
+
+    def _initial_tasks(self, sources):
+        '''One task per source: the prefix made of the source only.'''
+        index = self.csr.index
+        return [(i, [index[i]]) for i in sources]
+
+
+    def _task_finished(self, result, partials, checkpoint):
+        '''Add a partial row to partials and return the new tasks.'''
+        source, prefix, partial, frontier, stats = result
+        row = partials[source]
+        for j, p in partial.items():
+            row.setdefault(j, []).append(p)
+        if checkpoint is not None:
+            checkpoint.task_finished(source, prefix, partial, frontier)
+        if self.instrumentation is not None:
+            self.instrumentation.task_finished(source, stats, prefix)
+        return [(source, prefix) for prefix in frontier]
+
+
+    def _run(self, tasks, partials, checkpoint=None, output=None):
+        '''Run tasks (and all the tasks they split into) in a process pool,
+        collecting the partial rows in partials. Finished tasks and sources
+        are recorded in checkpoint, if given, and finished rows are written
+        into output (see _source_finished).'''
+        results = queue.Queue()
+        pending = deque(tasks)
+        in_flight = 0
+        outstanding = dict()
+        for source, prefix in tasks:
+            outstanding[source] = outstanding.get(source, 0) + 1
+        with SharedGraph(self.csr, self.self_loops) as graph, \
+             multiprocessing.Pool(self.processes, _initialize_worker,
+                                  (graph.spec,)) as pool:
+            while pending or in_flight:
+                while pending and in_flight < 2 * self.processes:
+                    source, prefix = pending.popleft()
+                    pool.apply_async(_run_task,
+                                     (source, prefix, self.formulation_type, self.max_paths,
+                                      self.instrumentation is not None),
+                                     callback=results.put, error_callback=results.put)
+                    in_flight += 1
+                result = results.get()
+                in_flight -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                source = result[0]
+                new_tasks = self._task_finished(result, partials, checkpoint)
+                pending.extendleft(reversed(new_tasks))
+                outstanding[source] += len(new_tasks) - 1
+                if outstanding[source] == 0:
+                    if checkpoint is not None:
+                        checkpoint.source_finished(source, partials[source])
+                    if self.instrumentation is not None:
+                        self.instrumentation.source_finished(source)
+                    self._source_finished(source, partials, output)
+
+
+    def _source_finished(self, source, partials, output, cache=True):
+        '''Reduce the partial row of a finished source, store it in
+        self.cache (if cache is True) and write it into output, if given.
+        The partial row is then dropped from partials.'''
+        store = cache and self.cache is not None
+        if not store and output is None:
+            return
+        row = self._row(partials[source])
+        if store:
+            self.cache.put_row(self.key, source, row)
+        if output is not None:
+            output.write_row(self.csr.index[source], row)
+            partials[source] = None
+
+
+    def _row(self, partial):
+        '''Reduce the partial row of a source into a list indexed by the CSR
+        node ids.'''
+        row = [0] * len(self.csr)
+        for j, parts in partial.items():
+            row[j] = sum_partials(parts)
+        return row
+
+
+    def _rows(self, sources, partials):
+        '''Reduce the partial rows into p_ij dictionaries with the keys of
+        Graph._probability_paths_from_i.'''
+        labels = self.csr.labels
+        p_ij = dict()
+        for i in sources:
+            p_ij.update({(i,j):0 for j in self.nodes})
+            for j, parts in partials[i].items():
+                p_ij[(i,labels[j])] = sum_partials(parts)
+        return p_ij
+
+
+    def probability_paths(self, sources=None, checkpoint=None, output=None):
+        '''Calculate p_ij for all the sources (all nodes by default). Returns
+        a dictionary with edge tuples (i,j) as keys, as merged in
+        binary_pij.py and weighted_pij.py. If a Checkpoint is given, the
+        work it already holds is skipped and the new work is recorded in it.
+        Sources whose rows are in self.cache are not calculated.
+        If output is given (a dense PijStore open with mode 'r+', e.g. from
+        pijformat.create_dense, or a SharedMatrix), the row of every source
+        is written into it by CSR node id as soon as the source is finished
+        and output is returned instead of the dictionary.'''
+        if sources is None:
+            sources = list(self.nodes)
+        partials = {i:dict() for i in sources}
+        missing = sources
+        if self.cache is not None:
+            missing = []
+            for i in sources:
+                row = self.cache.get_row(self.key, i)
+                if row is None:
+                    missing.append(i)
+                else:
+                    partials[i] = {j:[p] for j,p in enumerate(row) if reached(p)}
+                    self._source_finished(i, partials, output, cache=False)
+        if checkpoint is None:
+            tasks = self._initial_tasks(missing)
+        else:
+            tasks = checkpoint.resume(self, missing, partials)
+            # Sources the checkpoint had already finished.
+            pending = {source for source, prefix in tasks}
+            for i in missing:
+                if i not in pending:
+                    self._source_finished(i, partials, output)
+        if tasks:
+            self._run(tasks, partials, checkpoint, output)
+        if checkpoint is not None:
+            checkpoint.close()
+        if output is not None:
+            return output
+        return self._rows(sources, partials)
@@ -0,0 +1,175 @@
+# Read-only shared-memory graph and shared p_ij matrix for pool workers
+# Date: 18/10/2026
+# ======================
+#
+# The CSR arrays of a graph are copied once into a block of shared memory.
+# Pool workers attach to it and build a CSRGraph on top of memoryviews of
+# the block, so nothing but a small description of the block is pickled
+# and every worker reads the same physical copy of the graph. Results are
+# written into a shared N x N float64 matrix indexed by node id.
+from array import array
+from multiprocessing import shared_memory
+import multiprocessing
+from csrgraph import CSRGraph
+
+
+class SharedGraph:
+    def __init__(self, csr, self_loops=None):
+        '''Copy the arrays of a CSRGraph into a new block of shared memory.
+        Input variables:
+        - csr: CSRGraph,
+        - self_loops: optional sequence of self-loop weights by node id that
+        replaces csr.self_loops (e.g. Graph._self_loops()).
+        The owner must call close() (or use the SharedGraph as a context
+        manager) to release the block.'''
+        if self_loops is None:
+            self_loops = csr.self_loops
+        if all(isinstance(w, int) for w in self_loops):
+            self_loops = array('q', self_loops)
+        else:
+            self_loops = array('d', self_loops)
+        arrays = [csr.indptr, csr.indices, csr.weights, csr.out_strength, self_loops]
+
+        layout, offset = [], 0
+        for a in arrays:
+            layout.append((a.typecode, offset, len(a)))
+            offset += a.itemsize * len(a)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for a, (typecode, start, length) in zip(arrays, layout):
+            self.shm.buf[start:start + a.itemsize * length] = a.tobytes()
+        self.spec = (self.shm.name, csr.labels, tuple(layout))
+
+
+    @staticmethod
+    def attach(spec):
+        '''Attach to the shared block described by spec (SharedGraph.spec).
+        Returns a tuple (shm, csr): the SharedMemory handle, which must be
+        kept alive while csr is in use, and a read-only CSRGraph whose arrays
+        are views of the shared block.'''
+        name, labels, layout = spec
+        shm = shared_memory.SharedMemory(name=name)
+        views = []
+        for typecode, start, length in layout:
+            itemsize = array(typecode).itemsize
+            view = shm.buf[start:start + itemsize * length].toreadonly()
+            views.append(view.cast(typecode))
+        return shm, CSRGraph._from_arrays(labels, *views)
+
+
+    def close(self):
+        '''Release and remove the shared block.'''
+        self.shm.close()
+        self.shm.unlink()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+class SharedMatrix:
+    def __init__(self, N, name=None):
+        '''N x N float64 matrix in shared memory, filled with zeros. Create
+        it with name=None in the main process; workers open it by name.'''
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(8 * N * N, 1))
+            self.shm.buf[:8 * N * N] = bytes(8 * N * N)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.N = N
+        self.name = self.shm.name
+        self.values = self.shm.buf[:8 * N * N].cast('d')
+
+
+    def write_row(self, i, p_j):
+        '''Write the row of node id i.'''
+        N = self.N
+        self.values[i * N:(i + 1) * N] = array('d', p_j)
+
+
+    def row(self, i):
+        '''Return the row of node id i as a list.'''
+        N = self.N
+        return self.values[i * N:(i + 1) * N].tolist()
+
+
+    def close(self):
+        '''Release the matrix (and remove it if this is the owner).'''
+        self.values.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+
+# Shared graph and output matrix of the worker processes, set by
+# _initialize_worker.
+_worker_state = None
+
+
+def _initialize_worker(graph_spec, matrix_name):
+    '''Pool initializer: attach to the shared graph and output matrix.'''
+    global _worker_state
+    shm, csr = SharedGraph.attach(graph_spec)
+    matrix = SharedMatrix(len(csr), matrix_name) if matrix_name else None
+    _worker_state = (shm, csr, matrix)
+
+
+def _row_from_i(i, formulation_type):
+    '''Calculate the row of node id i and write it into the shared matrix.'''
+    shm, csr, matrix = _worker_state
+    matrix.write_row(i, csr.probability_paths_from(i, formulation_type))
+    return i
+
+
+def probability_paths_shared(G, formulation_type="Tutzauer", sources=None,
+                             processes=None, self_loops=None):
+    '''Calculate p_ij of Graph G with a pool of workers that share one
+    read-only copy of the graph and write their rows into a shared matrix.
+    Only the source node id is sent with each task.
+    Input variables:
+    - G: Graph,
+    - formulation_type: "Tutzauer" by default,
+    - sources: nodes for which p_ij is calculated (all nodes by default),
+    - processes: number of worker processes (default: all cores),
+    - self_loops: optional dictionary node -> self-loop weight used for the
+    stopping probability instead of the self-loops of G (as in
+    WorkStealingScheduler).
+    Output variables:
+    - dictionary with edge tuples (i,j) as keys, as merged in
+    binary_pij.py and weighted_pij.py.'''
+    csr = G.csr
+    labels = csr.labels
+    if sources is None:
+        sources = list(G.nodes)
+    if self_loops is None:
+        self_loops = G._self_loops()
+    else:
+        self_loops = [self_loops.get(n, 0) for n in labels]
+    with SharedGraph(csr, self_loops) as graph, SharedMatrix(len(csr)) as matrix:
+        with multiprocessing.Pool(processes, _initialize_worker,
+                                  (graph.spec, matrix.name)) as pool:
+            tasks = [(csr.index[i], formulation_type) for i in sources]
+            pool.starmap(_row_from_i, tasks)
+        p_ij = dict()
+        for i in sources:
+            row = matrix.row(csr.index[i])
+            p_ij.update({(i,j):0 for j in G.nodes})
+            for j, p in enumerate(row):
+                if p != 0:
+                    p_ij[(i,labels[j])] = p
+    return p_ij
@@ -0,0 +1,96 @@
+# Synthetic manufacturing networks
+# Date: 18/10/2026
+# ======================
+#
+# Generator of manufacturing paths and edges with the structure of a plant
+# made of production lines. The workstations of every line are grouped in
+# cells of consecutive stations. Items go through the cells of a line in
+# order, visit the stations of a cell in any order (rework, re-routing),
+# may skip stations and may jump ahead to a later cell of any line. Every
+# cell therefore becomes a strongly connected component of the graph.
+# Route frequencies follow a Zipf law, which gives the skewed edge weights
+# seen in data/clean_manufacturing_edges.txt.
+import random
+
+
+def _cells(stations, lines, cell_size):
+    '''Split the stations 0..stations-1 into lines of consecutive stations
+    and every line into cells of cell_size stations. Returns a list (lines)
+    of lists (cells) of lists of stations.'''
+    plant = []
+    for l in range(lines):
+        line = list(range(l * stations // lines, (l + 1) * stations // lines))
+        plant.append([line[k:k + cell_size] for k in range(0, len(line), cell_size)])
+    return plant
+
+
+
+def _route(plant, density, rng):
+    '''Generate the route of one item through the plant.'''
+    l = rng.randrange(len(plant))
+    c = 0
+    route = []
+    while c < len(plant[l]):
+        cell = list(plant[l][c])
+        rng.shuffle(cell)
+        route.extend(s for s in cell if rng.random() >= density)
+        c = c + 1
+        if rng.random() < density:
+            # Jump to a later cell of any line (relative to the line length).
+            l2 = rng.randrange(len(plant))
+            start = (c * len(plant[l2]) + len(plant[l]) - 1) // len(plant[l])
+            if start >= len(plant[l2]):
+                break
+            l, c = l2, rng.randrange(start, len(plant[l2]))
+    return tuple(route)
+
+
+
+def manufacturing_paths(stations=52, lines=4, cell_size=3, density=0.1,
+                        weight_skew=1.0, routes=1000, items=10**6, seed=None):
+    '''Generate manufacturing paths with counts.
+    Input variables:
+    - stations: number of workstations (identified 0..stations-1),
+    - lines: number of production lines the stations are split into,
+    - cell_size: number of stations per cell, i.e. the size of the strongly
+    connected components (1 gives an acyclic graph),
+    - density: probability that an item skips a station and probability
+    that it jumps to a later cell of any line after each cell (both add
+    edges to the graph),
+    - weight_skew: Zipf exponent of the route frequencies (0: all routes
+    are equally frequent),
+    - routes: number of routes generated (repeated routes are merged),
+    - items: approximate total number of manufactured items,
+    - seed: seed of the random number generator.
+    Output variables:
+    - dictionary with paths (tuples of stations) as keys and counts as
+    values, as returned by GraphFile.read_paths_with_count.'''
+    rng = random.Random(seed)
+    plant = _cells(stations, lines, cell_size)
+    frequencies = [(r + 1) ** -weight_skew for r in range(routes)]
+    total = sum(frequencies)
+    paths = dict()
+    for f in frequencies:
+        route = _route(plant, density, rng)
+        if len(route) == 0: continue
+        paths[route] = paths.get(route, 0) + max(1, round(items * f / total))
+    return paths
+
+
+
+def edges_from_paths(paths):
+    '''Edges (i,j) and their weights from manufacturing paths with counts,
+    as calculated in path_data_cleaning.py.'''
+    edges = dict()
+    for k,v in paths.items():
+        for edge in zip(k, k[1:]):
+            edges[edge] = edges.get(edge, 0) + v
+    return edges
+
+
+
+def manufacturing_network(**parameters):
+    '''Generate manufacturing paths and their edges. Accepts the same input
+    variables as manufacturing_paths and returns a tuple (paths, edges).'''
+    paths = manufacturing_paths(**parameters)
+    return paths, edges_from_paths(paths)
@@ -0,0 +1,288 @@
+# Streaming ingestion of time-stamp data into manufacturing paths
+# Date: 18/10/2026
+# ======================
+#
+# Chunked version of from_timestamp_to_paths.py. The header of
+# train_date.csv is parsed once into the station of every column. The file
+# is then read in chunks of rows, each converted into a NumPy array with
+# NaN for the missing time-stamps, so that the mean time-stamp of every
+# station is computed for a whole chunk at once. Memory is bounded by the
+# chunk size. The paths and edges (and their order) are the same as those
+# of the original script: the mean time-stamps are summed column by column
+# in the same order, and stations with equal means are ordered by their
+# '_S<n>_' string as the original sort of (time-stamp, string) tuples does.
+#
+# paths_from_timestamps_parallel splits the file into line-aligned byte
+# ranges parsed by a pool of processes. Every worker counts the paths and
+# edges of its range; the counters are merged pairwise, neighbouring ranges
+# first, in a tree whose shape only depends on the number of ranges. A
+# merge keeps the keys of the left range first, so both the counts and the
+# order of the keys are those of a serial run.
+#
+# Optionally, the path of every item is also written as a record with the
+# item Id and its completion time (its last time-stamp), one line per item
+# in the order of the rows, for the time-window analysis of timewindows.py.
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import numpy as np
+from graphfile import GraphFile
+
+
+class TimestampParser:
+    def __init__(self, header):
+        '''Parse the header line of train_date.csv ('Id' followed by columns
+        named L<line>_S<station>_D<feature>).'''
+        names = header.strip().split(',')[1:]
+        strings = []
+        column_station = []
+        for name in names:
+            s = re.findall('L.(_S.+?_)D', name)
+            if len(s) == 0:
+                column_station.append(-1)
+                continue
+            if s[0] not in strings:
+                strings.append(s[0])
+            column_station.append(strings.index(s[0]))
+
+        # Columns of every station (in file order) and the rank of the
+        # '_S<n>_' strings used to break ties between equal mean time-stamps.
+        self.stations = np.array([int(re.findall('_S([0-9]+)_', s)[0]) for s in strings])
+        self.columns = [[c + 1 for c, k in enumerate(column_station) if k == s]
+                        for s in range(len(strings))]
+        rank = sorted(range(len(strings)), key=lambda s: strings[s])
+        self.rank = np.empty(len(strings), dtype=np.int64)
+        self.rank[rank] = np.arange(len(strings))
+        self.number_of_columns = len(names) + 1
+
+
+    def _read_chunk(self, lines):
+        '''Convert lines of the csv file into an array of floats with NaN for
+        the missing values.'''
+        text = ''.join(line.rstrip() + '\n' for line in lines if line.strip())
+        # Two passes fill runs of any length of empty fields.
+        text = text.replace(',,', ',nan,').replace(',,', ',nan,').replace(',\n', ',nan\n')
+        if len(text) == 0:
+            return np.empty((0, self.number_of_columns))
+        return np.loadtxt(io.StringIO(text), delimiter=',', ndmin=2)
+
+
+    def paths_from_lines(self, lines):
+        '''Return the manufacturing paths (tuples of stations ordered by
+        their mean time-stamp) of the rows in lines, in the same order.
+        Rows without time-stamps give no path.'''
+        return [path for path in self._paths(self._read_chunk(lines)) if path is not None]
+
+
+    def records_from_lines(self, lines):
+        '''Return a path record (item, completion, path) for every row in
+        lines with time-stamps, in the same order: the item Id, its last
+        time-stamp and its manufacturing path.'''
+        data = self._read_chunk(lines)
+        times = data[:, 1:]
+        completion = np.where(np.isnan(times), -np.inf, times).max(axis=1, initial=-np.inf)
+        return [(int(item), t, path) for item, t, path in
+                zip(data[:, 0].tolist(), completion.tolist(), self._paths(data))
+                if path is not None]
+
+
+    def _paths(self, data):
+        '''Paths of the rows of an array of time-stamps (see _read_chunk),
+        with None for the rows without time-stamps.'''
+        rows = len(data)
+        seen = np.asfortranarray(~np.isnan(data))
+        data = np.asfortranarray(np.where(seen, data, 0))
+        means = np.full((rows, len(self.columns)), np.nan)
+        for s, columns in enumerate(self.columns):
+            # Adding the zeros of the missing values leaves the sums exactly
+            # as those of the present values only, in column order.
+            total = np.zeros(rows)
+            count = np.zeros(rows, dtype=np.int64)
+            for c in columns:
+                total += data[:, c]
+                count += seen[:, c]
+            visited = count > 0
+            means[visited, s] = total[visited] / count[visited]
+
+        visited = (~np.isnan(means)).sum(axis=1)
+        order = np.lexsort((np.broadcast_to(self.rank, means.shape), means), axis=1)
+        paths = []
+        for r in range(rows):
+            if visited[r] == 0:
+                paths.append(None)
+                continue
+            paths.append(tuple(self.stations[order[r, :visited[r]]].tolist()))
+        return paths
+
+
+
+def count_paths(paths, counts=None):
+    '''Add the paths (iterable of tuples) to the dictionary of counts.'''
+    if counts is None:
+        counts = dict()
+    for path in paths:
+        counts[path] = counts.get(path, 0) + 1
+    return counts
+
+
+
+def edges_from_paths(paths):
+    '''Edges and their weights from manufacturing paths with counts,
+    including the dummy edges from 'i' to the first station and from the
+    last station to 'f', as calculated in from_timestamp_to_paths.py. The
+    edges are in the order in which the original script first meets them.'''
+    edges = dict()
+    for k,v in paths.items():
+        for e in [('i', k[0])] + list(zip(k, k[1:])) + [(k[-1], 'f')]:
+            edges[e] = edges.get(e, 0) + v
+    return edges
+
+
+
+def paths_from_timestamps(filename, chunk_size=10000, records_filename=None):
+    '''Read the time-stamp csv file in chunks of chunk_size rows. If
+    records_filename is given, the path record (item, completion, path) of
+    every row is also written to it (see GraphFile.write_path_records).
+    Output variables:
+    - dictionary with manufacturing paths (tuples) as keys and counts as
+    values,
+    - dictionary with edges (i,j) as keys and their weights as values.'''
+    with open(filename, 'rb') as f:
+        header = f.readline().decode()
+        start = f.tell()
+    return _count_range(filename, header, start, os.path.getsize(filename), chunk_size,
+                        records_filename)
+
+
+
+def _byte_ranges(filename, parts):
+    '''Split the rows of the file (after the header) into at most parts byte
+    ranges (start, end) that begin and end at line boundaries.'''
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as f:
+        f.readline()
+        first = f.tell()
+        bounds = [first]
+        for k in range(1, parts):
+            b = first + (size - first) * k // parts
+            if b <= bounds[-1]:
+                continue
+            f.seek(b - 1)
+            f.readline()
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+        if bounds[-1] < size:
+            bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+
+def _chunks_of_range(filename, start, end, chunk_size):
+    '''Yield the lines of the byte range [start, end) of the file in lists
+    of chunk_size lines.'''
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            lines = []
+            while position < end and len(lines) < chunk_size:
+                line = f.readline()
+                position += len(line)
+                lines.append(line.decode())
+            yield lines
+
+
+
+def _count_range(filename, header, start, end, chunk_size, records_filename=None):
+    '''Count the paths and edges of the rows in the byte range [start, end)
+    of the file. If records_filename is given, the path records of the rows
+    are written to it.'''
+    parser = TimestampParser(header)
+    counts = dict()
+    chunks = _chunks_of_range(filename, start, end, chunk_size)
+    if records_filename is None:
+        for lines in chunks:
+            count_paths(parser.paths_from_lines(lines), counts)
+    else:
+        def counted_records():
+            for lines in chunks:
+                for record in parser.records_from_lines(lines):
+                    counts[record[2]] = counts.get(record[2], 0) + 1
+                    yield record
+        GraphFile(records_filename).write_path_records(counted_records())
+    return counts, edges_from_paths(counts)
+
+
+
+def merge_counts(left, right):
+    '''Add the counts of the dictionary right to left (in place) and return
+    left. New keys are appended in the order of right.'''
+    for k,v in right.items():
+        left[k] = left.get(k, 0) + v
+    return left
+
+
+
+def _merge_pair(left, right):
+    '''Merge the (paths, edges) counters of two neighbouring ranges.'''
+    return merge_counts(left[0], right[0]), merge_counts(left[1], right[1])
+
+
+
+def tree_reduce(counters, pool=None):
+    '''Merge a list of (paths, edges) counters of consecutive ranges by
+    merging neighbours pairwise, level by level. Merges of a level run in
+    the pool, if given.'''
+    while len(counters) > 1:
+        pairs = list(zip(counters[0::2], counters[1::2]))
+        if pool is None:
+            merged = [_merge_pair(l, r) for l, r in pairs]
+        else:
+            merged = pool.starmap(_merge_pair, pairs)
+        if len(counters) % 2 == 1:
+            merged.append(counters[-1])
+        counters = merged
+    return counters[0] if counters else (dict(), dict())
+
+
+
+def paths_from_timestamps_parallel(filename, processes=None, chunk_size=10000,
+                                   parts=None, records_filename=None):
+    '''Parallel version of paths_from_timestamps with the same output.
+    Input variables:
+    - filename: time-stamp csv file,
+    - processes: number of worker processes (default: all cores),
+    - chunk_size: number of rows parsed at once by a worker,
+    - parts: number of byte ranges (default: 4 per process, so that the
+    workers stay busy when ranges take different times),
+    - records_filename: optional file for the path records of the rows.
+    Every worker writes the records of its range to a temporary file and
+    the files are then joined in the order of the ranges, so the records
+    are in the order of the rows, as with paths_from_timestamps.'''
+    processes = processes or multiprocessing.cpu_count()
+    if parts is None:
+        parts = 4 * processes
+    with open(filename) as f:
+        header = f.readline()
+    ranges = _byte_ranges(filename, parts)
+    part_filenames = [None] * len(ranges)
+    if records_filename is not None:
+        directory, name = os.path.split(records_filename)
+        # Parts are plain text files; the joined file is compressed if its
+        # name asks for it.
+        part_filenames = [os.path.join(directory, '.tmp-{}-{}.part'.format(k, name))
+                          for k in range(len(ranges))]
+    tasks = [(filename, header, start, end, chunk_size, part)
+             for (start, end), part in zip(ranges, part_filenames)]
+    with multiprocessing.Pool(processes) as pool:
+        counters = pool.starmap(_count_range, tasks)
+        result = tree_reduce(counters, pool)
+    if records_filename is not None:
+        with GraphFile(records_filename).open('w') as output:
+            for part in part_filenames:
+                with open(part) as f:
+                    shutil.copyfileobj(f, output, 2**20)
+                os.remove(part)
+    return result
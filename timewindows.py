@@ -0,0 +1,169 @@
+# Sliding and tumbling time windows of edge weights and entropy
+# Date: 18/10/2026
+# ======================
+#
+# The path records of the items (item, completion time, path) written by
+# from_timestamp_to_paths.py are grouped into panes of slide time-stamp
+# units by their completion time: every pane holds the counts of the paths
+# completed in it, so the records can come in any order and are read once.
+# A window of width = panes * slide units is the sum of consecutive panes
+# (a tumbling window is a single pane). Moving the window one pane forward
+# adds the counts of the pane that enters and subtracts those of the pane
+# that leaves, so the path and edge counters are updated incrementally
+# instead of being recounted, and the edges whose weight changed are known.
+#
+# The entropy time series keeps one Graph (edges between stations plus
+# self-loops on end nodes, as in weighted_pij.py method 2) edited in place
+# with Graph.update_edges: windows whose graph did not change reuse the
+# previous entropy, and otherwise only the sources that can reach an edited
+# edge are recalculated, exactly, with CondensationEngine.
+import sys
+from graph import Graph
+from graphfile import GraphFile
+from condensation import CondensationEngine
+from csrgraph import node_sort_key
+from timestamp_ingestion import edges_from_paths
+
+
+class WindowAggregator:
+    def __init__(self, width, slide=None):
+        '''Initialize the aggregator. Input variables:
+        - width: width of the windows in time-stamp units,
+        - slide: the windows start every slide units (default: width, i.e.
+        tumbling windows). width must be a multiple of slide.'''
+        if slide is None:
+            slide = width
+        panes = round(width / slide)
+        if slide <= 0 or panes < 1 or abs(panes * slide - width) > 1e-9 * width:
+            raise ValueError("The window width must be a positive multiple of the slide.")
+        self.width = width
+        self.slide = slide
+        self.panes_per_window = panes
+        self.panes = dict()
+        self.items = 0
+
+
+    def add(self, path, completion, count=1):
+        '''Add count items with path completed at time completion.'''
+        pane = self.panes.setdefault(int(completion // self.slide), dict())
+        path = tuple(path)
+        pane[path] = pane.get(path, 0) + count
+        self.items += count
+
+
+    def add_records(self, records):
+        '''Add path records (item, completion, path), e.g. from
+        GraphFile.read_path_records. Returns the number of items added.'''
+        items = self.items
+        for item, completion, path in records:
+            self.add(path, completion)
+        return self.items - items
+
+
+    def windows(self):
+        '''Yield every window that contains items, in time order, as a tuple
+        (start, end, paths, edges, changed):
+        - start, end: the window covers completion times in [start, end),
+        - paths: dictionary path -> count of the window,
+        - edges: dictionary (i,j) -> weight of the window, with the dummy
+        'i' and 'f' nodes (as timestamp_ingestion.edges_from_paths),
+        - changed: set of edges whose weight changed since the previous
+        window (all the edges for the first one).
+        paths and edges are updated in place when the next window is
+        generated; copy them to keep them.'''
+        if not self.panes:
+            return
+        first, last = min(self.panes), max(self.panes)
+        P = self.panes_per_window
+        paths, edges = dict(), dict()
+        # Edge counts of the panes inside the window, calculated when a pane
+        # enters and subtracted when it leaves.
+        pane_edges = dict()
+        for k in range(first, last + P):
+            pane = self.panes.get(k, {})
+            for path, count in pane.items():
+                paths[path] = paths.get(path, 0) + count
+            pane_edges[k] = edges_from_paths(pane)
+            delta = dict(pane_edges[k])
+            for path, count in self.panes.get(k - P, {}).items():
+                paths[path] -= count
+                if paths[path] == 0:
+                    del paths[path]
+            for e, count in pane_edges.pop(k - P, {}).items():
+                delta[e] = delta.get(e, 0) - count
+            changed = set()
+            for e, d in delta.items():
+                if d == 0: continue
+                changed.add(e)
+                weight = edges.get(e, 0) + d
+                if weight == 0:
+                    del edges[e]
+                else:
+                    edges[e] = weight
+            yield (k - P + 1) * self.slide, (k + 1) * self.slide, paths, edges, changed
+
+
+
+def _graph_edge(e):
+    '''Edge of the entropy graph that holds the weight of edge e of a
+    window: edges into 'f' become self-loops on the end nodes and edges out
+    of 'i' are left out (None).'''
+    i, j = e
+    if i == 'i':
+        return None
+    if j == 'f':
+        return (i, i)
+    return e
+
+
+
+def entropy_series(windows, formulation_type="Tutzauer"):
+    '''Entropy of every node in each window of WindowAggregator.windows.
+    The graph of a window has the edges between stations and a self-loop
+    on every end station weighted by the items that end there. Only the
+    sources whose p_ij changed are recalculated.
+    Output variables: generator of tuples (start, end, entropy, changed)
+    with entropy a dictionary node -> entropy and changed the set of nodes
+    whose entropy was recalculated.'''
+    G = Graph(dict())
+    entropy = dict()
+    for start, end, paths, edges, changed in windows:
+        if changed:
+            G.update_edges([(*_graph_edge(e), edges.get(e)) for e in changed
+                            if _graph_edge(e) is not None])
+            for n in [n for n in entropy if n not in G.nodes]:
+                del entropy[n]
+            sources = G.pop_invalidated_sources()
+            if sources:
+                engine = CondensationEngine(G, formulation_type)
+                for i in sources:
+                    entropy[i] = engine.calculate_node_entropy(i)[1]
+        else:
+            sources = set()
+        yield start, end, dict(entropy), sources
+
+
+
+def write_entropy_series(series, filename):
+    '''Write an entropy time series (entropy_series) to file, one line per
+    window and node as follows:
+    start end node C_H'''
+    with GraphFile(filename).open('w') as f:
+        for start, end, entropy, changed in series:
+            f.writelines("{} {} {} {}\n".format(start, end, n, entropy[n])
+                         for n in sorted(entropy, key=node_sort_key))
+    return True
+
+
+
+if __name__ == "__main__":
+    # Entropy time series of the manufacturing network, e.g. windows of 100
+    # time-stamp units every 10 units:
+    #     python timewindows.py 100 10
+    # Path records are written by from_timestamp_to_paths.py.
+    width = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+    slide = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    aggregator = WindowAggregator(width, slide)
+    aggregator.add_records(GraphFile("data/manufacturing_path_records.txt").read_path_records())
+    write_entropy_series(entropy_series(aggregator.windows()),
+                         "results/entropy_time_series.txt")
@@ -0,0 +1,115 @@
+# Memoized visited-set dynamic programming for path-transfer probabilities
+# Date: 18/10/2026
+# ======================
+#
+# The probability mass that a walk carries from node t onwards (where it
+# stops, and where it leaves a restricted set of nodes) only depends on t
+# and on the already visited nodes that the walk can still run into, i.e.
+# the visited nodes within reach(t). It does not depend on the order in
+# which they were visited. Many prefixes share the same (t, visited within
+# reach(t)) state, so the sub-trees of the DFS are evaluated once and
+# reused.
+from functools import lru_cache
+
+
+class VisitedSetEvaluator:
+    def __init__(self, csr, formulation_type="Tutzauer", self_loops=None,
+                 nodes=None, cache_size=2**16):
+        '''Memoized evaluator of path probabilities on a CSRGraph.
+        Input variables:
+        - csr: CSRGraph,
+        - formulation_type: "Tutzauer" by default. Any other value follows
+        the arrival formulation proposed in the article,
+        - self_loops: optional sequence of self-loop weights by node id
+        (defaults to csr.self_loops),
+        - nodes: optional set of node ids the walk is restricted to (e.g. a
+        strongly connected component). Moves out of this set are reported
+        as exits instead of being followed,
+        - cache_size: maximum number of states kept in the LRU cache.'''
+        self.csr = csr
+        self.self_loops = csr.self_loops if self_loops is None else self_loops
+        self.tutzauer = formulation_type == "Tutzauer"
+        if nodes is None:
+            nodes = range(len(csr))
+        self.nodes = set(nodes)
+        self.reach = self._reach_masks()
+        self._evaluate = lru_cache(maxsize=cache_size)(self._evaluate_state)
+
+
+    def _reach_masks(self):
+        '''Bitmask of the nodes reachable from each node t within self.nodes
+        (t included). Computed by a DFS from every node.'''
+        indptr, indices = self.csr.indptr, self.csr.indices
+        reach = {}
+        for t in self.nodes:
+            mask, stack = 1 << t, [t]
+            while stack:
+                u = stack.pop()
+                for v in indices[indptr[u]:indptr[u + 1]]:
+                    if v in self.nodes and not mask >> v & 1:
+                        mask |= 1 << v
+                        stack.append(v)
+            reach[t] = mask
+        return reach
+
+
+    def _evaluate_state(self, t, visited):
+        '''Mass vectors of the walks continuing from node id t when the nodes
+        in the bitmask visited (t included, restricted to reach(t)) have
+        already been visited. Returns two dictionaries: stop, the
+        probability mass ending at each node, and exits, the mass leaving
+        self.nodes into each node outside of it. The returned dictionaries
+        are cached and must not be modified.'''
+        csr = self.csr
+        indptr, indices, weights = csr.indptr, csr.indices, csr.weights
+        start, end = indptr[t], indptr[t + 1]
+
+        D_t = csr.out_strength[t]
+        for k in range(start, end):
+            u = indices[k]
+            if u != t and visited >> u & 1:
+                D_t = D_t - weights[k]
+
+        if self.tutzauer and D_t != 0:
+            stop = {t: self.self_loops[t] / D_t}
+        else:
+            stop = {t: 1}
+        exits = {}
+        if D_t == 0:
+            return stop, exits
+
+        for k in range(start, end):
+            u = indices[k]
+            if u == t or visited >> u & 1:
+                continue
+            T_k = weights[k] / D_t
+            if u not in self.nodes:
+                exits[u] = exits.get(u, 0) + T_k
+                continue
+            stop_u, exits_u = self._evaluate(u, (visited | 1 << u) & self.reach[u])
+            for j, p in stop_u.items():
+                stop[j] = stop.get(j, 0) + T_k * p
+            for j, p in exits_u.items():
+                exits[j] = exits.get(j, 0) + T_k * p
+        return stop, exits
+
+
+    def flows_from(self, e):
+        '''Return the (stop, exits) mass dictionaries of the walks starting at
+        node id e. The dictionaries are copies and can be modified.'''
+        stop, exits = self._evaluate(e, 1 << e)
+        return dict(stop), dict(exits)
+
+
+    def probability_paths_from(self, i):
+        '''Calculate all the probabilities i -> j for all j in G. Returns a
+        list p_j indexed by node id, as CSRGraph.probability_paths_from.'''
+        p_j = [0] * len(self.csr)
+        for j, p in self._evaluate(i, 1 << i)[0].items():
+            p_j[j] = p
+        return p_j
+
+
+    def cache_info(self):
+        '''Hits, misses, maximum size and current size of the state cache.'''
+        return self._evaluate.cache_info()